@@ -1,6 +1,18 @@
-from .core import Primitive, synchronized, PyThread, gated, Timeout, Timer
+from .core import Primitive, synchronized, PyThread, gated, Timeout, Timer, TimerService, timer_service, DeadlineExceeded, Cancelled, \
+    TaskRejected, DependencyFailed
+from .cancellation import CancellationToken
 from .dequeue import DEQueue
-from .task_queue import TaskQueue, Task, schedule_task
+from .task_queue import TaskQueue, Task, schedule_task, ProcessTaskQueue, CoroutineTask
+from .task_graph import TaskGraph
+from .aio import EventLoopThread
+from .ratelimit import TokenBucket, SlidingWindow
+from .concurrency import AIMDLimit, GradientLimit
+from .retry import RetryPolicy
+from .shedding import CoDel
+from .policies import EDFPolicy, SJFPolicy
+from .stats import Histogram, TaskQueueStats
+from .profiling import LockProfiler, lock_profiler
+from .executors import ThreadExecutor, ProcessExecutor, InterpreterExecutor
 from .Scheduler import Scheduler
 from .Subprocess import ShellCommand
 from .RWLock import RWLock
@@ -20,18 +32,20 @@ version_info = (tuple(int(x) for x in Version.split(".")) + (0,0,0))[:3]
 __a_ll__ = [
     'Primitive',
     'PyThread',
-    'TimerThread',
+    'TimerThread', 'TimerService', 'timer_service',
     'DEQueue',
     'gated',
     'synchronized',
-    'Task',
-    'TaskQueue',
+    'Task', 'CoroutineTask', 'EventLoopThread',
+    'TaskQueue', 'ProcessTaskQueue', 'TaskGraph', 'ThreadExecutor', 'ProcessExecutor', 'InterpreterExecutor',
     'Subprocess',
     'ShellCommand',
     'Version', '__version__', 'version_info',
-    'Timeout',
+    'Timeout', 'DeadlineExceeded', 'Cancelled', 'TaskRejected', 'DependencyFailed', 'CancellationToken',
     'Promise',
     'Scheduler',
     'Gate', 'LogFile', 'LogStream',
-    'Escrow', 'Producer', 'Gang'
+    'Escrow', 'Producer', 'Gang',
+    'TokenBucket', 'SlidingWindow', 'AIMDLimit', 'GradientLimit', 'RetryPolicy', 'CoDel', 'EDFPolicy', 'SJFPolicy', 'Histogram', 'TaskQueueStats',
+    'LockProfiler', 'lock_profiler'
 ]
@@ -0,0 +1,44 @@
+import asyncio
+from .core import PyThread, Primitive
+
+class EventLoopThread(PyThread):
+
+    def __init__(self, name=None, start=True):
+        """Thread running an asyncio event loop. The loop can be used from other threads with thread-safe asyncio functions,
+        such as ``asyncio.run_coroutine_threadsafe()``.
+
+        Args:
+            name (str): thread name
+            start (bool): start the thread immediately. Default: True
+        """
+        PyThread.__init__(self, name=name, daemon=True)
+        self.Loop = asyncio.new_event_loop()
+        if start:
+            self.start()
+
+    def run(self):
+        asyncio.set_event_loop(self.Loop)
+        try:
+            self.Loop.run_forever()
+        finally:
+            self.Loop.close()
+
+    def stop(self):
+        PyThread.stop(self)
+        self.Loop.call_soon_threadsafe(self.Loop.stop)
+
+_EventLoopLock = Primitive()
+_EventLoopThread = None
+
+def default_event_loop():
+    """Returns the event loop run by the process-wide EventLoopThread, starting the thread on first call.
+
+    Returns:
+        asyncio.AbstractEventLoop: the event loop
+    """
+    global _EventLoopThread
+    if _EventLoopThread is None:
+        with _EventLoopLock:
+            if _EventLoopThread is None:
+                _EventLoopThread = EventLoopThread(name="pythreader.EventLoop")
+    return _EventLoopThread.Loop
@@ -0,0 +1,87 @@
+import time
+from .core import Primitive, synchronized, Cancelled
+
+class CancellationToken(Primitive):
+
+    def __init__(self):
+        """Cooperative cancellation token. A long running task can poll the token or wait on it instead of sleeping,
+        and stop when the token is cancelled, e.g. because the task was cancelled or its deadline has passed.
+        """
+        Primitive.__init__(self)
+        self.Cancelled = False
+        self.Reason = None
+        self.Callbacks = []
+
+    @property
+    def is_cancelled(self):
+        """
+        Returns:
+            boolean: whether the token was cancelled
+        """
+        return self.Cancelled
+
+    @property
+    def reason(self):
+        """
+        Returns:
+            object: the reason passed to cancel(), or None
+        """
+        return self.Reason
+
+    def cancel(self, reason=None):
+        """Cancels the token, wakes up all threads waiting for it and calls the callbacks registered with on_cancel().
+        Subsequent calls have no effect.
+
+        Args:
+            reason (object): optional reason, usually an exception instance. Default: None
+        """
+        with self:
+            if self.Cancelled:
+                return
+            self.Cancelled = True
+            self.Reason = reason
+            callbacks, self.Callbacks = self.Callbacks, []
+            self.wakeup()
+        for cb in callbacks:
+            cb(self)
+
+    def on_cancel(self, callback):
+        """Registers a function to be called with the token as the argument when the token is cancelled.
+        If the token is already cancelled, the function is called immediately.
+
+        Args:
+            callback (callable): function to call
+        """
+        with self:
+            if not self.Cancelled:
+                self.Callbacks.append(callback)
+                return
+        callback(self)
+
+    @synchronized
+    def wait(self, timeout=None):
+        """Blocks until the token is cancelled or the timeout expires. Can be used instead of time.sleep()
+        in a task which should stop promptly when cancelled.
+
+        Args:
+            timeout (int or float): time-out in seconds. Default: wait indefinitely
+
+        Returns:
+            boolean: whether the token was cancelled
+        """
+        t1 = None if timeout is None else time.time() + timeout
+        while not self.Cancelled:
+            dt = None if t1 is None else t1 - time.time()
+            if dt is not None and dt <= 0:
+                break
+            self.sleep(dt)
+        return self.Cancelled
+
+    def check(self):
+        """Raises an exception if the token was cancelled. If the cancellation reason is an exception, it is raised,
+        otherwise, the Cancelled exception is raised.
+        """
+        if self.Cancelled:
+            if isinstance(self.Reason, BaseException):
+                raise self.Reason
+            raise Cancelled(self.Reason)
@@ -0,0 +1,112 @@
+import math
+
+#
+# Adaptive concurrency limits for TaskQueue. A limit object implements the TaskQueue delegate methods
+# taskEnded() and taskFailed(), which the queue calls in addition to its delegate, and exposes the current
+# limit as the "limit" property. The queue calls them with its lock released, so the limit objects
+# tolerate races between concurrent updates: the worst outcome is a slightly stale limit.
+#
+
+class AIMDLimit(object):
+
+    def __init__(self, min_limit=1, max_limit=100, initial=None, increase=1.0, backoff=0.9, latency_threshold=None):
+        """Additive increase/multiplicative decrease limit, similar to TCP congestion control. Each successful task
+        increases the limit by ``increase/limit``, so that the limit grows by about ``increase`` per "round" of ``limit`` tasks.
+        A failed task or a task which ran longer than ``latency_threshold`` multiplies the limit by ``backoff``.
+        
+        Args:
+            min_limit (int): lower bound for the limit. Default: 1
+            max_limit (int): upper bound for the limit. Default: 100
+            initial (int): initial limit. Default: ``min_limit``
+            increase (float): additive increase per round. Default: 1
+            backoff (float): multiplicative decrease factor, between 0 and 1. Default: 0.9
+            latency_threshold (float): task run time in seconds above which the task is treated as a sign of overload. Default: None
+        """
+        self.MinLimit = min_limit
+        self.MaxLimit = max_limit
+        self.Limit = float(min_limit if initial is None else initial)
+        self.Increase = increase
+        self.Backoff = backoff
+        self.LatencyThreshold = latency_threshold
+
+    @property
+    def limit(self):
+        """
+        Returns:
+            int: current concurrency limit
+        """
+        return int(self.Limit)
+
+    def _decrease(self):
+        self.Limit = max(self.MinLimit, self.Limit * self.Backoff)
+
+    def taskEnded(self, queue, task, result):
+        run_time = task.run_time
+        if self.LatencyThreshold is not None and run_time is not None and run_time > self.LatencyThreshold:
+            self._decrease()
+        else:
+            self.Limit = min(self.MaxLimit, self.Limit + self.Increase / self.Limit)
+
+    def taskFailed(self, queue, task, exc_type, exc_value, tb):
+        self._decrease()
+
+class GradientLimit(object):
+
+    def __init__(self, min_limit=1, max_limit=100, initial=None, smoothing=0.2, tolerance=1.5, 
+                    min_latency_decay=0.001, backoff=0.9):
+        """Latency-driven limit in the style of TCP Vegas. The limit follows the ratio between the lowest observed run time,
+        which approximates the run time without queuing downstream, and the smoothed recent run time:
+
+            new_limit = limit * min(1, tolerance * min_latency / latency) + sqrt(limit)
+
+        so the limit grows while the run time stays close to the minimum and shrinks when the run time grows. The ``sqrt(limit)``
+        term allows the limit to probe for more capacity. The limit is updated on every task end, so the new limit is blended
+        into the current one with the ``smoothing`` weight to keep it from swinging between the bounds.
+        Failed tasks multiply the limit by ``backoff``.
+
+        Args:
+            min_limit (int): lower bound for the limit. Default: 1
+            max_limit (int): upper bound for the limit. Default: 100
+            initial (int): initial limit. Default: ``min_limit``
+            smoothing (float): weight of each new run time in the exponentially smoothed run time, and of each new limit
+                in the limit. Default: 0.2
+            tolerance (float): how much longer than the minimum the run time may get before the limit is reduced. Default: 1.5
+            min_latency_decay (float): rate at which the observed minimum run time drifts up toward the smoothed run time, 
+                so that the limit can adapt when the downstream gets slower for good. Default: 0.001
+            backoff (float): multiplicative decrease factor on task failure. Default: 0.9
+        """
+        self.MinLimit = min_limit
+        self.MaxLimit = max_limit
+        self.Limit = float(min_limit if initial is None else initial)
+        self.Smoothing = smoothing
+        self.Tolerance = tolerance
+        self.MinLatencyDecay = min_latency_decay
+        self.Backoff = backoff
+        self.MinLatency = None
+        self.Latency = None
+
+    @property
+    def limit(self):
+        """
+        Returns:
+            int: current concurrency limit
+        """
+        return int(self.Limit)
+
+    def taskEnded(self, queue, task, result):
+        run_time = task.run_time
+        if run_time is None:
+            return
+        run_time = max(run_time, 1e-6)
+        if self.Latency is None:
+            self.Latency = self.MinLatency = run_time
+        else:
+            self.Latency += (run_time - self.Latency) * self.Smoothing
+            self.MinLatency = min(run_time, self.MinLatency + (self.Latency - self.MinLatency) * self.MinLatencyDecay)
+        gradient = max(0.5, min(1.0, self.Tolerance * self.MinLatency / self.Latency))
+        limit = self.Limit * gradient + math.sqrt(self.Limit)
+        limit = self.Limit + (limit - self.Limit) * self.Smoothing
+        self.Limit = max(self.MinLimit, min(self.MaxLimit, limit))
+
+    def taskFailed(self, queue, task, exc_type, exc_value, tb):
+        self.Limit = max(self.MinLimit, self.Limit * self.Backoff)
@@ -1,6 +1,8 @@
-from threading import RLock, Thread, Event, Condition, Semaphore, currentThread, get_ident
+from threading import Lock, RLock, Thread, Event, Condition, Semaphore, currentThread
 import time
-import sys
+import sys, math, traceback, functools
+from collections import deque
+from .profiling import lock_profiler
 
 Waiting = []
 In = []
@@ -11,27 +13,61 @@ class Timeout(Exception):
 class QueueClosed(Exception):
     pass
 
+class DeadlineExceeded(Timeout):
+    pass
+
+class Cancelled(Exception):
+    pass
+
+class TaskRejected(Exception):
+    pass
+
+class DependencyFailed(Exception):
+    pass
+
 def threadName():
     t = currentThread()
     return str(t)
 
 def synchronized(method):
+    # uses the lock directly instead of going through Primitive.__enter__/__exit__. acquire/release is
+    # a bit faster than the "with" statement
+    @functools.wraps(method)
     def smethod(self, *params, **args):
-        me = get_ident()
-        with self:
-            out = method(self, *params, **args)
-        return out
-    smethod.__doc__ = method.__doc__
+        lock = self._Lock
+        lock.acquire()
+        try:
+            return method(self, *params, **args)
+        finally:
+            lock.release()
     return smethod
 
 def gated(method):
+    @functools.wraps(method)
     def smethod(self, *params, **args):
         with self._Gate:
-            out = method(self, *params, **args)
-        return out
-    smethod.__doc__ = method.__doc__
+            return method(self, *params, **args)
+    return smethod
+
+def _relocking(method):
+    # like synchronized, but if the primitive's lock is not reentrant, the method does not lock the primitive and
+    # must be called with the primitive already locked
+    @functools.wraps(method)
+    def smethod(self, *params, **args):
+        if not self._Reentrant:
+            return method(self, *params, **args)
+        lock = self._Lock
+        lock.acquire()
+        try:
+            return method(self, *params, **args)
+        finally:
+            lock.release()
     return smethod
 
+# protects lazy creation of the primitives' conditions and gate semaphores. The primitive's own lock can not be used
+# for that because it may be non-reentrant and already held by the thread
+_CreateLock = Lock()
+
 
 def printWaiting():
     print("waiting:----")
@@ -53,22 +89,91 @@ class UnlockContext(object):
         self.Prim._Lock.__enter__()    
 
 class Primitive:
-    def __init__(self, gate=1, lock=None, name=None):
+
+    _Reentrant = True
+
+    def __init__(self, gate=1, lock=None, name=None, reentrant=True, profile=None):
         """
         Initiaslizes new Primitive object
         
         Args:
             gate (int): initial value for the Gate semapthore. Default = 1
-            lock (Lock or RLock): Lock or RLock for the primitive to use. Default - new RLock object
+            lock (Lock or RLock): Lock or RLock for the primitive to use. Default - new RLock or Lock object, depending on ``reentrant``
             name (str): Name for the primitive. Default - unnamed
+            reentrant (bool): whether the lock is reentrant. A non-reentrant Lock is faster than RLock, but a thread holding it
+                must not lock the primitive again, so synchronized methods of the primitive can not call each other.
+                sleep(), sleep_until() and wakeup() of a non-reentrant primitive must be called with the primitive locked.
+                Default: True
+            profile (bool): record the lock contention statistics of the primitive in the lock profiler, see profiling.py.
+                Default: None - profile if the profiler is enabled
         """
         self._Kind = self.__class__.__name__
-        self._Lock = lock if lock is not None else RLock()
+        self._Reentrant = reentrant
+        if lock is None:
+            lock = RLock() if reentrant else Lock()
+        if profile or profile is None and lock_profiler.Enabled:
+            lock = lock_profiler.wrap(lock, name or self._Kind)
+        self._Lock = lock
         #print ("Primitive:", self, " _Lock:", self._Lock)
-        self._WakeUp = Condition(self._Lock)
-        self._Gate = Semaphore(gate)
+        # the Condition and the gate Semaphore are created on first use. Most primitives, e.g. Tasks and Promises,
+        # never sleep and are never gated
+        self._Condition = None
+        self._Conditions = None         # named conditions: name -> Condition
+        self._GateSemaphore = None
+        self._GateValue = gate
         self.Name = name
         self.Timer = None
+
+    @property
+    def _WakeUp(self):
+        cond = self._Condition
+        if cond is None:
+            with _CreateLock:
+                cond = self._Condition
+                if cond is None:
+                    cond = self._Condition = Condition(self._Lock)
+        return cond
+
+    def condition(self, name=None):
+        """Returns a condition variable bound to the primitive's lock. Threads waiting for different state changes can sleep
+        on different named conditions, so that a state change wakes up only the threads interested in it. For example:
+
+            with queue:
+                while not queue.Items:
+                    queue.sleep(condition="not_empty")
+            ...
+            with queue:
+                queue.Items.append(item)
+                queue.wakeup(condition="not_empty", all=False)      # wake up one consumer
+
+        Args:
+            name (str): condition name. Default: None - the primitive's default condition used by sleep() and wakeup()
+
+        Returns:
+            Condition: the condition, created on first use
+        """
+        if name is None:
+            return self._WakeUp
+        conditions = self._Conditions
+        cond = None if conditions is None else conditions.get(name)
+        if cond is None:
+            with _CreateLock:
+                if self._Conditions is None:
+                    self._Conditions = {}
+                cond = self._Conditions.get(name)
+                if cond is None:
+                    cond = self._Conditions[name] = Condition(self._Lock)
+        return cond
+
+    @property
+    def _Gate(self):
+        gate = self._GateSemaphore
+        if gate is None:
+            with _CreateLock:
+                gate = self._GateSemaphore
+                if gate is None:
+                    gate = self._GateSemaphore = Semaphore(self._GateValue)
+        return gate
         
     def __str__(self):
         ident = ('"%s"' % (self.Name,)) if self.Name else ("@%s" % (("%x" % (id(self),))[-4:],))
@@ -131,8 +236,8 @@ class Primitive:
         """
         return UnlockContext(self)
 
-    @synchronized
-    def sleep(self, timeout = None, function=None, arguments=()):
+    @_relocking
+    def sleep(self, timeout = None, function=None, arguments=(), condition=None):
         """
         Blocks until wakep() method is called on the same primitive. The primitive will be unlocked for the duration of the sleep() call.
         Then the primitive will be locked again and if the function is provided, it will be called while the primitive is locked
@@ -140,14 +245,15 @@ class Primitive:
         
         Args:
             timeout (float or int): time-out. If timed-out, RuntimeError exception will be raised.
+            condition (str): name of the condition to wait on, see condition(). Default: the default condition
         """
-        self._WakeUp.wait(timeout)
+        self.condition(condition).wait(timeout)
         if function is not None:
             result = function(*arguments)
             return result
 
-    @synchronized
-    def sleep_until(self, predicate, *params, timeout = None, **args):
+    @_relocking
+    def sleep_until(self, predicate, *params, timeout = None, condition=None, **args):
         """
         Blocks until a condition is satisfied. The method will continue calling sleep() and when it wakes up, it will call the
         predicate function and check if the predicate is satisfied and if not go back to sleep. The predicate function is
@@ -165,6 +271,7 @@ class Primitive:
             params: positional arguments to pass to each predicate function call
             args: keyword arguments to pass to each predicate function call
             timeout (int or float): timeout. If timed-out, RuntimeError exception will be raised
+            condition (str): name of the condition to wait on, see condition(). Default: the default condition
         """
         #print("sleep", self, get_ident(), "   condition lock:", self._WakeUp._lock, "...")
         t1 = None if timeout is None else time.time() + timeout
@@ -174,45 +281,55 @@ class Primitive:
             delta = None
             if t1 is not None:
                 delta = max(0.0, t1 - time.time())
-            self.sleep(delta)
+            self.sleep(delta, condition=condition)
         else:
             raise Timeout()
             
-    @synchronized
-    def wakeup(self, n=1, all=True, function=None, arguments=()):
+    @_relocking
+    def wakeup(self, n=1, all=True, function=None, arguments=(), condition=None):
         """Wakes up all or some thread, which is sleeping on the primitive.
         
         Args:
             n (int): number of threads to wake up. Default is 1
             all (bool): wake up all threads sleeping on the primitive. If True, ``n`` argument is ignored
+            condition (str): name of the condition to notify, see condition(). Default: the default condition
         """
         
         if function is not None:
             function(*arguments)
+        if condition is None:
+            cond = self._Condition
+        else:
+            cond = None if self._Conditions is None else self._Conditions.get(condition)
+        if cond is None:
+            return                  # nobody has ever slept on the condition
         if all:
-            self._WakeUp.notifyAll()
+            cond.notify_all()
         else:
-            self._WakeUp.notify(n)
+            cond.notify(n)
             
     @synchronized
     def alarm(self, *params, **args):
-        """Starts a new "alarm" Timer thread associated with the Primitive. A Primitive can have only one alarm thread associated with it.
-        If another alarm thread was already created using a previous call to alarm(), the old thread will be cancelled and
+        """Starts a new "alarm" Timer associated with the Primitive. A Primitive can have only one alarm Timer associated with it.
+        If another alarm Timer was already created using a previous call to alarm(), the old Timer will be cancelled and
         deleted.
         
         Args:
             params: positional arguments to pass to the Timer constructor
             args: keyword arguments to pass to the Timer constructor
         """
-        self.cancel_alarm()
+        self._cancel_alarm()
         self.Timer = Timer(*params, **args)
 
     @synchronized
     def cancel_alarm(self):
         """
-        Cancels the alarm thread associated with the Primitive, if any. 
+        Cancels the alarm Timer associated with the Primitive, if any. 
         """
-        
+        self._cancel_alarm()
+
+    def _cancel_alarm(self):
+        # must be called from a synchronized method !
         if self.Timer is not None:
             self.Timer.cancel()
             self.Timer = None
@@ -233,11 +350,13 @@ class PyThread(Thread, Primitive):
     def stop(self):
         self.Stop = True
 
-class Timer(PyThread):
+class Timer(Primitive):
     
-    def __init__(self, fcn, *params, t=None, interval=None, start=True, name=None, daemon=True, onexception=None, **args):
-        """Initializes new Timer thread. pythreader's Timer is similar in functionality with threading.Timer, but it has additional
+    def __init__(self, fcn, *params, t=None, interval=None, start=True, name=None, daemon=True, onexception=None, service=None, **args):
+        """Initializes new Timer. pythreader's Timer is similar in functionality with threading.Timer, but it has additional
         functionality. In particular pythreader's Timer can run as a periodic timer, firing at specified frequency until it is cancelled.
+        The Timer does not have its own thread. It is armed in the TimerService and ``fcn`` is called by one of the TimerService
+        dispatch threads, so many timers can be used without creating many threads.
         
         Args:
             fcn (function): function to call every time the Timer fires
@@ -246,14 +365,15 @@ class Timer(PyThread):
             t (numeric): specifies the time when to fire the Timer first time. ``t`` can be either absolute timestamp - time in seconds since the
                 Epoch or relative to current time. If ``t`` is less than 3e8 (~10 years), then it is interpreted as relative to current time.
                 Default: current time plus ``interval``
-            start (bool): to start the Timer thread immediately. Otherwise, the Timer thread will be created but not run until started explicitly
+            start (bool): to start the Timer immediately. Otherwise, the Timer will be created but not armed until started explicitly
                 using ``start()`` method. Default: start immediately
-            daemon (bool): whether the Timer thread should be a daemon thread. Default: True
+            daemon (bool): ignored, kept for compatibility. Timers never keep the process running
             onexception (function): a callback to call if ``fcn`` raies an exception. The callback will be called with 3 arguments:
                 exception type, exception value and the traceback, similar to what sys.exc_info() returns. Default: ignore any exceptions raised by ``fcn``
+            service (TimerService): the TimerService to use. Default: the process-wide TimerService
         """
         
-        PyThread.__init__(self, name=name, daemon=daemon)
+        Primitive.__init__(self, name=name)
         if t is None:
             self.T = time.time() + interval
         else:
@@ -263,52 +383,410 @@ class Timer(PyThread):
         self.Params = params
         self.Args = args
         self.Interval = interval
+        self.Service = service
+        self.Entry = None               # TimerService entry
         self.Cancelled = False
         self.Paused = False
+        self.Missed = False             # the timer came up while paused
+        self.Started = False
+        self.Firing = False
+        self.Ended = False
         if start:
             self.start()
 
-    def run(self):
-        try:
-            again = True
-            while again and not self.Cancelled:
-                again = False
-                now = time.time()
-                if now < self.T:
-                    self.sleep(self.T - now)
-                while self.Paused and not self.Cancelled:
-                    self.sleep(100)
-                if not self.Cancelled:
-                    try:    self.Fcn(*self.Params, **self.Args)
-                    except:
-                        if self.OnException is not None:
-                            try:
-                                self.OnException(*sys.exc_info())
-                            except:
-                                pass
-                    if not self.Cancelled and self.Interval:
-                        self.T = time.time() + self.Interval
-                        again = True
-        finally:
-            # to break any circular links
-            self.Fcn = self.Args = self.Params = None
+    @synchronized
+    def start(self):
+        """Arms the Timer, if it was created with ``start=False``
+        """
+        if self.Started:
+            raise RuntimeError("timers can only be started once")
+        self.Started = True
+        if not self.Cancelled:
+            self._arm()
+
+    def _arm(self):
+        # must be called from a synchronized method !
+        service = self.Service or timer_service()
+        self.Entry = service.schedule(self.T, self._fire)
+
+    def _end(self):
+        # must be called from a synchronized method !
+        self.Ended = True
+        # to break any circular links
+        self.Fcn = self.Args = self.Params = None
+        self.wakeup(condition="ended")
+
+    def _fire(self):
+        # TimerService callback
+        with self:
+            self.Entry = None
+            if self.Cancelled:
+                return
+            if self.Paused:
+                self.Missed = True
+                return
+            self.Firing = True
+            fcn, params, args = self.Fcn, self.Params, self.Args
+        try:    fcn(*params, **args)
+        except:
+            if self.OnException is not None:
+                try:
+                    self.OnException(*sys.exc_info())
+                except:
+                    pass
+        with self:
+            self.Firing = False
+            if not self.Cancelled and self.Interval:
+                self.T = time.time() + self.Interval
+                self._arm()
+            else:
+                self._end()
 
+    @synchronized
     def cancel(self):
-        """Cancels the Timer thread
+        """Cancels the Timer
         """
+        if self.Cancelled:
+            return
         self.Cancelled = True
-        self.wakeup()
+        if self.Entry is not None:
+            (self.Service or timer_service()).cancel(self.Entry)
+            self.Entry = None
+        if not self.Firing:
+            self._end()
 
     def pause(self):
-        """Pauses the Timer thread. In fact the thread will continue running, but it will not fire intil ``resume`` method is called
+        """Pauses the Timer. The timer stays armed, but it will not fire intil ``resume`` method is called
         """
         self.Paused = True
 
+    @synchronized
     def resume(self):
         """Resumes the timer firing. Next time the timer will not necessarily fire immediately when resumed, but it will fire at the next
-        end of the firing interval.
+        end of the firing interval. If the timer came up while it was paused, it fires when resumed.
         """
         self.Paused = False
+        if self.Missed and not self.Cancelled:
+            self.Missed = False
+            self.T = time.time()
+            self._arm()
+
+    def is_alive(self):
+        """
+        Returns:
+            boolean: whether the timer was started and has not ended yet. A one-time timer ends after it fires, a periodic timer
+            when it is cancelled
+        """
+        return self.Started and not self.Ended
+
+    @synchronized
+    def join(self, timeout=None):
+        """Waits for the timer to end, similarly to threading.Thread.join()
+
+        Args:
+            timeout (int or float): time-out in seconds. Default: wait indefinitely
+        """
+        t1 = None if timeout is None else time.time() + timeout
+        while not self.Ended:
+            dt = None if t1 is None else t1 - time.time()
+            if dt is not None and dt <= 0:
+                break
+            self.sleep(dt, condition="ended")
+
+
+class _TimerEntry(object):
+
+    __slots__ = ("T", "Tick", "Fcn", "Params", "Args", "Cancelled", "Level", "Index")
+
+    def __init__(self, t, tick, fcn, params, args):
+        self.T = t
+        self.Tick = tick
+        self.Fcn = fcn
+        self.Params = params
+        self.Args = args
+        self.Cancelled = False
+        self.Level = self.Index = -1        # wheel slot, or -1 if the entry is due
+
+class TimerService(PyThread):
+
+    Bits = 6
+    Slots = 1 << Bits           # slots per wheel level
+    Levels = 6                  # the wheel spans 64**6 ticks, ~2 years at 1 millisecond resolution
+
+    def __init__(self, name=None, resolution=0.001, workers=4, stall_timeout=0.05, idle_timeout=10):
+        """Calls scheduled functions at specified times. Pending calls are kept in a hierarchical timing wheel, so scheduling
+        and cancelling a call are O(1). The wheel is advanced by the TimerService thread, which hands the due calls over to
+        a small pool of dispatch threads. Use ``timer_service()`` to get the process-wide TimerService.
+
+        The wheel has 6 levels of 64 slots. A slot of the first level holds the calls due in one tick, a slot of each next level
+        spans all the slots of the previous level. When the time gets to a higher level slot, its calls are moved down to the
+        lower levels, so each call is moved at most 5 times. The thread sleeps until the next non-empty slot comes up.
+
+        Args:
+            name (str): name for the thread
+            resolution (float): tick length in seconds. Calls are made up to one tick late. Default: 1 millisecond
+            workers (int): number of permanent dispatch threads. The dispatch threads call the scheduled functions concurrently.
+                When none of the due calls is picked up for ``stall_timeout`` seconds, e.g. because all the threads are blocked
+                in the scheduled functions, one more thread is started, so that the other calls are not held up. The additional
+                threads exit after being idle for ``idle_timeout`` seconds. If 0, the functions are called one after another
+                in the TimerService thread and are expected to return quickly. Default: 4
+            stall_timeout (int or float): time in seconds without progress, after which another dispatch thread is started. Default: 0.05
+            idle_timeout (int or float): time in seconds after which an idle additional dispatch thread exits. Default: 10
+        """
+        PyThread.__init__(self, name=name, daemon=True)
+        self.Resolution = resolution
+        self.Origin = time.time()
+        self.Tick = 0                   # the calls due at or before this tick have been made
+        self.Wheel = [[{} for _ in range(self.Slots)] for _ in range(self.Levels)]        # slot: {entry: None}
+        self.Occupied = [0] * self.Levels       # bitmaps of non-empty slots
+        self.Due = []                   # entries to dispatch at the next wheel advance
+        self.Count = 0
+        self.NextTick = None            # tick the thread sleeps until, None if it is not sleeping
+        self.Calls = deque()            # due calls waiting for a dispatch thread: (fcn, params, args)
+        self.MinWorkers = workers
+        self.NWorkers = 0
+        self.IdleWorkers = 0
+        self.IdleTimeout = idle_timeout
+        self.StallTimeout = stall_timeout
+        self.Taken = 0                  # number of calls picked up by the dispatch threads
+        self.CheckedTaken = 0           # value of Taken and the time when the dispatch was last seen making progress
+        self.CheckedTime = 0.0
+        with self:
+            for _ in range(workers):
+                self._start_worker(True)
+        self.start()
+
+    def _current_tick(self):
+        return int((time.time() - self.Origin) / self.Resolution)
+
+    def _insert(self, entry):
+        # must be called from a synchronized method !
+        # returns the tick, at which the thread has to wake up to process the entry
+        tick, now = entry.Tick, self.Tick
+        if tick <= now:
+            entry.Level = entry.Index = -1
+            self.Due.append(entry)
+            return now
+        bits = self.Bits
+        limit = now | ((1 << (bits * self.Levels)) - 1)        # last tick of the wheel span, which has the high bits of now
+        if tick > limit:
+            # entries beyond the wheel span are placed at its end and re-inserted when it comes up
+            if limit == now:
+                # now is the last tick of the span, keep the entry aside until the next tick
+                entry.Level = entry.Index = -1
+                self.Due.append(entry)
+                return now + 1
+            tick = limit
+        level = ((tick ^ now).bit_length() - 1) // bits                 # highest 6-bit group where the tick differs from now
+        shift = bits * level
+        index = (tick >> shift) & (self.Slots - 1)
+        self.Wheel[level][index][entry] = None
+        self.Occupied[level] |= 1 << index
+        entry.Level = level
+        entry.Index = index
+        return ((now >> (shift + bits)) << (shift + bits)) | (index << shift)
+
+    def _next_event(self):
+        # must be called from a synchronized method !
+        # returns the next tick, at which a slot has to be fired or moved down, or None if the wheel is empty.
+        # All the non-empty slots of a level come up before any slot of the next level
+        bits, tick = self.Bits, self.Tick
+        for level, occupied in enumerate(self.Occupied):
+            if occupied:
+                shift = bits * level
+                current = (tick >> shift) & (self.Slots - 1)
+                rest = occupied >> (current + 1)
+                index = current + (rest & -rest).bit_length()
+                return ((tick >> (shift + bits)) << (shift + bits)) | (index << shift)
+        return None
+
+    def _advance(self, target):
+        # must be called from a synchronized method !
+        # moves the wheel to the target tick and returns the due entries
+        bits, mask = self.Bits, self.Slots - 1
+        while self.Tick < target:
+            tick = self._next_event()
+            if tick is None or tick > target:
+                self.Tick = target
+                break
+            self.Tick = tick
+            for level in range(self.Levels - 1, -1, -1):
+                shift = bits * level
+                if tick & ((1 << shift) - 1):
+                    continue                # the tick is not at a slot boundary of the level
+                index = (tick >> shift) & mask
+                if self.Occupied[level] & (1 << index):
+                    slot = self.Wheel[level][index]
+                    entries = list(slot)
+                    slot.clear()
+                    self.Occupied[level] &= ~(1 << index)
+                    for entry in entries:
+                        self._insert(entry)
+        due = []
+        entries, self.Due = self.Due, []
+        for entry in entries:
+            if entry.Cancelled:
+                continue
+            if entry.Tick > self.Tick:
+                self._insert(entry)         # was kept aside at the end of the wheel span
+            else:
+                entry.Cancelled = True      # fired entries can not be cancelled
+                due.append(entry)
+        self.Count -= len(due)
+        return due
+
+    @synchronized
+    def schedule(self, t, fcn, *params, **args):
+        """Schedules a call to the function
+        
+        Args:
+            t (numeric): time to call the function at. If ``t`` is less than 3e8 (~10 years), then it is interpreted as relative to current time.
+            fcn (callable): function to call
+            params: positional arguments for the function
+            args: keyword arguments for the function
+            
+        Returns:
+            object: handle, which can be used to cancel the call
+        """
+        if t < 3e8:
+            t = time.time() + t
+        tick = max(0, math.ceil((t - self.Origin) / self.Resolution))
+        entry = _TimerEntry(t, tick, fcn, params, args)
+        tick = self._insert(entry)
+        self.Count += 1
+        if self.NextTick is not None and tick < self.NextTick:
+            self.wakeup()               # the thread is sleeping past the new entry
+        return entry
+
+    @synchronized
+    def cancel(self, entry):
+        """Cancels the scheduled call
+        
+        Args:
+            entry (object): handle returned by ``schedule()``
+        """
+        if not entry.Cancelled:
+            entry.Cancelled = True
+            entry.Fcn = entry.Params = entry.Args = None
+            self.Count -= 1
+            level, index = entry.Level, entry.Index
+            if level >= 0:
+                slot = self.Wheel[level][index]
+                del slot[entry]
+                if not slot:
+                    self.Occupied[level] &= ~(1 << index)
+
+    def reschedule(self, entry, t, fcn, *params, **args):
+        """Cancels the scheduled call, if ``entry`` is not None, and schedules a new one
+        
+        Returns:
+            object: handle for the new call
+        """
+        with self:
+            if entry is not None:
+                self.cancel(entry)
+            return self.schedule(t, fcn, *params, **args)
+
+    @synchronized
+    def pending(self):
+        """
+        Returns:
+            int: number of scheduled calls not yet made or cancelled
+        """
+        return self.Count
+
+    def _call(self, fcn, params, args):
+        try:    fcn(*params, **args)
+        except:
+            traceback.print_exc(file=sys.stderr)
+
+    def _start_worker(self, permanent):
+        # must be called from a synchronized method !
+        self.NWorkers += 1
+        PyThread(target=self._work, args=(permanent,), name="%s.worker" % (self.Name,), daemon=True).start()
+
+    def _work(self, permanent):
+        # dispatch thread
+        while True:
+            with self:
+                t1 = None if permanent else time.time() + self.IdleTimeout
+                self.IdleWorkers += 1
+                while not (self.Calls or self.Stop):
+                    dt = None if t1 is None else t1 - time.time()
+                    if dt is not None and dt <= 0:
+                        break
+                    self.sleep(dt, condition="calls")
+                self.IdleWorkers -= 1
+                if self.Stop or not self.Calls:
+                    self.NWorkers -= 1
+                    return
+                fcn, params, args = self.Calls.popleft()
+                self.Taken += 1
+            self._call(fcn, params, args)
+
+    def _dispatch(self, entries):
+        calls = [(entry.Fcn, entry.Params, entry.Args) for entry in entries]
+        for entry in entries:
+            entry.Fcn = entry.Params = entry.Args = None
+        if not self.MinWorkers:
+            for call in calls:
+                self._call(*call)
+            return
+        with self:
+            self.Calls.extend(calls)
+            self.wakeup(condition="calls", all=False, n=len(calls))
+
+    def _check_stalled(self):
+        # must be called from a synchronized method !
+        # starts another dispatch thread if no queued call has been picked up for StallTimeout seconds,
+        # so that blocking calls do not hold up the others
+        now = time.time()
+        if not self.Calls or self.Taken != self.CheckedTaken:
+            self.CheckedTaken = self.Taken
+            self.CheckedTime = now
+        elif now >= self.CheckedTime + self.StallTimeout:
+            self._start_worker(False)
+            self.CheckedTime = now
+
+    def run(self):
+        while not self.Stop:
+            with self:
+                self._check_stalled()
+                due = self._advance(self._current_tick())
+                if not due:
+                    tick = self._next_event()
+                    if self.Due:
+                        tick = self.Tick + 1        # entries kept aside at the end of the wheel span
+                    delay = None if tick is None else max(0.0, self.Origin + tick * self.Resolution - time.time())
+                    if self.Calls:
+                        delay = self.StallTimeout if delay is None else min(delay, self.StallTimeout)
+                    if tick is None:
+                        self.NextTick = math.inf
+                    else:
+                        self.NextTick = tick
+                    self.sleep(delay)
+                    self.NextTick = None
+                    continue
+            self._dispatch(due)
+
+    @synchronized
+    def stop(self):
+        PyThread.stop(self)
         self.wakeup()
+        self.wakeup(condition="calls")
+
+_TimerServiceLock = RLock()
+_TimerService = None
 
+def timer_service():
+    """Returns the process-wide TimerService, creating it on first call
 
+    Returns:
+        TimerService: the timer service
+    """
+    global _TimerService
+    if _TimerService is None:
+        with _TimerServiceLock:
+            if _TimerService is None:
+                _TimerService = TimerService(name="pythreader.TimerService")
+    return _TimerService
@@ -3,21 +3,35 @@ import time
 
 class DEQueue(Primitive):
 
-    def __init__(self, capacity=None):
-        Primitive.__init__(self)
+    # Consumers wait on the "not_empty" condition and producers on the "not_full" condition. Each added or removed item
+    # wakes up only one thread of the other kind, instead of all the blocked threads.
+
+    def __init__(self, capacity=None, reentrant=True):
+        """
+        Args:
+            capacity (int): maximum number of items in the queue. Default: unlimited
+            reentrant (bool): use a reentrant lock. With ``reentrant=False``, the queue uses a faster plain Lock, and the thread
+                holding the queue locked (``with queue: ...``) must not call the queue's methods. Default: True
+        """
+        Primitive.__init__(self, reentrant=reentrant)
         self.Capacity = capacity
         self.List = []
         self.Closed = False
     
+    def _wakeup_all(self):
+        # must be called from a synchronized method !
+        self.wakeup(condition="not_empty")
+        self.wakeup(condition="not_full")
+
     @synchronized
     def close(self):
         self.Closed = True
-        self.wakeup()
+        self._wakeup_all()
 
     @synchronized
     def open(self):
         self.Closed = False
-        self.wakeup()
+        self._wakeup_all()
 
     def _wait_for_room(self, timeout):
         # must be called from a synchronized method !
@@ -31,7 +45,7 @@ class DEQueue(Primitive):
                 if t > t1:
                     raise RuntimeError("Operation timed-out")
                 dt = t1 - t
-            self.sleep(dt)
+            self.sleep(dt, condition="not_full")
 
     @synchronized    
     def append(self, item, timeout=None, force=False):
@@ -40,7 +54,7 @@ class DEQueue(Primitive):
         if self.Closed:
             raise RuntimeError("Queue is closed")
         self.List.append(item)
-        self.wakeup()
+        self.wakeup(condition="not_empty", all=False)
         
     def __lshift__(self, item):
         return self.append(item)
@@ -54,7 +68,7 @@ class DEQueue(Primitive):
         if self.Closed:
             raise RuntimeError("Queue is closed")
         self.List.insert(0, item)
-        self.wakeup()
+        self.wakeup(condition="not_empty", all=False)
 
     def __rrshift__(self, item):
         return self.insert(item)
@@ -62,10 +76,10 @@ class DEQueue(Primitive):
     @synchronized
     def pop(self, index=0, timeout=None):
         while not (self.List or self.Closed):
-            self.sleep(timeout)
+            self.sleep(timeout, condition="not_empty")
         try:    
             item = self.List.pop(index)
-            self.wakeup()       # in case someone is waiting to add an item
+            self.wakeup(condition="not_full", all=False)       # in case someone is waiting to add an item
         except IndexError:
             item = None         # closed
         return item
@@ -95,7 +109,7 @@ class DEQueue(Primitive):
     @synchronized
     def flush(self):
         self.List = []
-        self.wakeup()
+        self.wakeup(condition="not_full")
         
     @synchronized
     def items(self):
@@ -110,7 +124,8 @@ class DEQueue(Primitive):
         if self.List:
             first = self.List[0]
             if first is x or first == x:
-                self.pop()
+                self.List.pop(0)
+                self.wakeup(condition="not_full", all=False)
                 return x
         return None
 
@@ -123,6 +138,7 @@ class DEQueue(Primitive):
     def __contains__(self, item):
         return item in self.List
         
+    @synchronized
     def remove(self, item):
         self.List.remove(item)
-        self.wakeup()
+        self.wakeup(condition="not_full", all=False)
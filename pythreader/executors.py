@@ -0,0 +1,83 @@
+import os
+from threading import Lock
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from concurrent.futures import InterpreterPoolExecutor         # Python 3.14+
+except ImportError:
+    InterpreterPoolExecutor = None
+
+def _run_task(task):
+    # runs in the worker process. The task arrives as a pickled copy without its locks and promise
+    if callable(task):
+        return task()
+    else:
+        return task.run()
+
+class ThreadExecutor(object):
+
+    """Runs tasks in the calling thread. This is the default TaskQueue executor."""
+
+    def call(self, task):
+        return _run_task(task)
+
+    def shutdown(self, wait=True):
+        pass
+
+class ProcessExecutor(object):
+
+    def __init__(self, nworkers=None, mp_context=None):
+        """Runs tasks in a pool of worker processes, so that CPU-bound tasks are not serialized on the GIL.
+        The TaskQueue thread, which starts the task, blocks until the worker process returns the result.
+        The task is pickled and sent to the worker process, so it has to be picklable, and any changes the task
+        makes to its own attributes while running are not seen by the parent process.
+        
+        Args:
+            nworkers (int): number of worker processes. Default: number of CPUs
+            mp_context: multiprocessing context to create the worker processes. Default: multiprocessing default context
+        """
+        self.NWorkers = nworkers or os.cpu_count()
+        self.MPContext = mp_context
+        self.Pool = None
+        self.PoolLock = Lock()
+        self.Backend = "process"
+
+    def create_pool(self):
+        return ProcessPoolExecutor(max_workers=self.NWorkers, mp_context=self.MPContext)
+
+    def pool(self):
+        # the workers are started lazily, on first use
+        with self.PoolLock:
+            if self.Pool is None:
+                self.Pool = self.create_pool()
+            return self.Pool
+
+    def call(self, task):
+        return self.pool().submit(_run_task, task).result()
+
+    def shutdown(self, wait=True):
+        with self.PoolLock:
+            pool, self.Pool = self.Pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+class InterpreterExecutor(ProcessExecutor):
+
+    def __init__(self, nworkers=None):
+        """Runs tasks in a pool of subinterpreters, each with its own GIL. Subinterpreters run in the same process, so they start
+        faster than worker processes, but like with ``ProcessExecutor``, the tasks are pickled to be sent to the subinterpreter.
+        Functions must be defined at the module level and the arguments and the results must be shareable or picklable.
+        On Python versions without ``concurrent.futures.InterpreterPoolExecutor`` (before 3.14), falls back to worker processes.
+        The ``Backend`` attribute tells which one is used: "interpreter" or "process".
+
+        Args:
+            nworkers (int): number of subinterpreters. Default: number of CPUs
+        """
+        ProcessExecutor.__init__(self, nworkers)
+        if InterpreterPoolExecutor is not None:
+            self.Backend = "interpreter"
+
+    def create_pool(self):
+        if InterpreterPoolExecutor is None:
+            return ProcessExecutor.create_pool(self)
+        return InterpreterPoolExecutor(max_workers=self.NWorkers)
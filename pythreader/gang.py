@@ -3,8 +3,8 @@ from .core import Primitive, synchronized
 
 class Gang(Primitive):
 
-    def __init__(self, callable, params=None, n=1, concurrency=None, stagger=None, delegate=None):
-        self.Queue = TaskQueue(concurrency, stagger=stagger, delegate=delegate or self)
+    def __init__(self, callable, params=None, n=1, concurrency=None, stagger=None, delegate=None, executor="thread"):
+        self.Queue = TaskQueue(concurrency, stagger=stagger, delegate=delegate or self, executor=executor)
         if params is None:
             params = [None] * n
         self.Promises = [self.Queue.add(callable, param).promise for param in params]
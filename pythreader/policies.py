@@ -0,0 +1,77 @@
+import math
+
+#
+# Scheduling policies for TaskQueue. A policy orders the ready tasks with the same priority. It implements:
+#
+#   key(task, t) - returns the sort key for the task, which became ready at time t. Tasks with lower keys start first.
+#                   Called with the queue locked, so it must be fast.
+#   task_ran(task) - called after each run of a task with the queue unlocked, so that the policy can learn from run times
+#
+# The queue keeps the ready tasks in a heap, so selection of the next task to start is O(log n) for any policy.
+#
+
+class EDFPolicy(object):
+
+    def key(self, task, t):
+        """Earliest deadline first. Tasks without a deadline start after the tasks with deadlines, in FIFO order.
+        """
+        deadline = task._Private.Deadline
+        return math.inf if deadline is None else deadline
+
+    def task_ran(self, task):
+        pass
+
+class SJFPolicy(object):
+
+    def __init__(self, alpha=0.2):
+        """Shortest job first. The cost of a task is the ``cost`` passed to TaskQueue.append() or, if not specified, the mean
+        run time of the previous runs of the same function (or Task subclass), estimated as exponentially weighted moving average.
+        The estimates are kept per function code, so that all the closures, lambdas and bound methods created from the same
+        source code share the estimate, and the policy does not keep the functions and the objects they refer to alive.
+        Tasks of functions, which have not run yet, are estimated at the mean run time of all the tasks.
+
+        Args:
+            alpha (float): moving average smoothing factor, between 0 and 1. Higher values adapt to changes faster. Default: 0.2
+        """
+        self.Alpha = alpha
+        self.MeanRunTimes = {}          # function code or Task subclass -> estimated run time
+        self.MeanRunTime = 0.0          # across all the tasks
+
+    @staticmethod
+    def _function(task):
+        f = getattr(task, "F", None)
+        if f is None:
+            return task.__class__
+        f = getattr(f, "func", f)               # functools.partial
+        f = getattr(f, "__func__", f)           # bound method
+        code = getattr(f, "__code__", None)
+        return code if code is not None else f.__class__       # callable object
+
+    def estimate(self, task):
+        """
+        Returns:
+            float: the estimated run time of the task in seconds
+        """
+        cost = task._Private.Cost
+        if cost is None:
+            cost = self.MeanRunTimes.get(self._function(task), self.MeanRunTime)
+        return cost
+
+    def key(self, task, t):
+        return self.estimate(task)
+
+    def task_ran(self, task):
+        run_time = task.run_time
+        if run_time is None:
+            return
+        alpha = self.Alpha
+        f = self._function(task)
+        mean = self.MeanRunTimes.get(f)
+        self.MeanRunTimes[f] = run_time if mean is None else mean + alpha * (run_time - mean)
+        self.MeanRunTime += alpha * (run_time - self.MeanRunTime)
+
+Policies = {
+    "fifo":     None,           # built into TaskQueue
+    "edf":      EDFPolicy,
+    "sjf":      SJFPolicy
+}
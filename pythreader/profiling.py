@@ -0,0 +1,259 @@
+import time
+from threading import Lock
+from .stats import Histogram
+
+#
+# Lock contention profiler. When enabled, globally with lock_profiler.enable() or for a single primitive with
+# Primitive(profile=True), the primitive's lock is wrapped in a ProfiledLock, which records the time spent waiting
+# for the lock and holding it. The statistics are aggregated per primitive name or, for unnamed primitives, per kind.
+# Primitives created while the profiler is disabled are not wrapped and do not pay anything.
+#
+
+class LockProfile(object):
+
+    def __init__(self, name):
+        """Contention statistics of the primitives with the same name. Updates are protected by a separate lock, because
+        the profile is shared by several primitive locks. The histograms have fixed size, so recording an acquisition
+        does not allocate memory.
+
+        Args:
+            name (str): primitive name or kind
+        """
+        self.Name = name
+        self.Lock = Lock()
+        self.Acquisitions = 0
+        self.Contended = 0              # acquisitions, which had to wait for the lock
+        self.Waiters = 0                # threads currently waiting
+        self.MaxWaiters = 0
+        self.WaitTime = Histogram(max_value=60.0)
+        self.HoldTime = Histogram(max_value=60.0)
+
+    def waiting(self, n):
+        with self.Lock:
+            self.Waiters += n
+            if self.Waiters > self.MaxWaiters:
+                self.MaxWaiters = self.Waiters
+
+    def record(self, wait_time, contended, hold_time):
+        # called once per acquisition, when the lock is released
+        with self.Lock:
+            self.Acquisitions += 1
+            if contended:
+                self.Contended += 1
+            self.WaitTime.record(wait_time)
+            self.HoldTime.record(hold_time)
+
+    def reset(self):
+        with self.Lock:
+            self.Acquisitions = self.Contended = self.MaxWaiters = 0
+            self.WaitTime.reset()
+            self.HoldTime.reset()
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: name, counters and the "wait_time" and "hold_time" histogram snapshots
+        """
+        with self.Lock:
+            return {
+                "name":             self.Name,
+                "acquisitions":     self.Acquisitions,
+                "contended":        self.Contended,
+                "waiters":          self.Waiters,
+                "max_waiters":      self.MaxWaiters,
+                "wait_time":        self.WaitTime.snapshot(),
+                "hold_time":        self.HoldTime.snapshot()
+            }
+
+class ProfiledLock(object):
+
+    def __init__(self, lock, profile):
+        """Lock or RLock wrapper, which records the lock wait and hold times in the profile. Hold time is measured
+        from the outermost acquisition to the matching release. The wrapper can be used with threading.Condition.
+
+        Args:
+            lock (Lock or RLock): the lock to wrap
+            profile (LockProfile): the profile to record the statistics in
+        """
+        self.Lock = lock
+        self.Profile = profile
+        self.Depth = 0                  # recursion depth, modified only by the thread holding the lock
+        self.HoldStart = 0.0
+        self.WaitTime = 0.0             # of the current acquisition, recorded in the profile on release
+        self.Contended = False
+        self.Reentrant = hasattr(lock, "_release_save")        # RLock
+
+    def acquire(self, blocking=True, timeout=-1):
+        lock = self.Lock
+        if lock.acquire(False):
+            wait_time = 0.0
+            contended = False
+        else:
+            if not blocking:
+                return False
+            profile = self.Profile
+            profile.waiting(1)
+            t0 = time.perf_counter()
+            try:
+                acquired = lock.acquire(True, timeout)
+            finally:
+                profile.waiting(-1)
+            if not acquired:
+                return False
+            wait_time = time.perf_counter() - t0
+            contended = True
+        self.Depth += 1
+        if self.Depth == 1:
+            self.HoldStart = time.perf_counter()
+            self.WaitTime = wait_time
+            self.Contended = contended
+        return True
+
+    def release(self):
+        self.Depth -= 1
+        if self.Depth:
+            self.Lock.release()
+        else:
+            hold_time = time.perf_counter() - self.HoldStart
+            wait_time, contended = self.WaitTime, self.Contended
+            self.Lock.release()
+            self.Profile.record(wait_time, contended, hold_time)
+
+    __enter__ = acquire
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def locked(self):
+        return self.Lock.locked()
+
+    #
+    # threading.Condition protocol
+    #
+
+    def _is_owned(self):
+        if self.Reentrant:
+            return self.Lock._is_owned()
+        if self.Lock.acquire(False):
+            self.Lock.release()
+            return False
+        return True
+
+    def _release_save(self):
+        depth, self.Depth = self.Depth, 0
+        hold_time = time.perf_counter() - self.HoldStart
+        wait_time, contended = self.WaitTime, self.Contended
+        if self.Reentrant:
+            state = self.Lock._release_save()
+        else:
+            state = None
+            self.Lock.release()
+        self.Profile.record(wait_time, contended, hold_time)
+        return (state, depth)
+
+    def _acquire_restore(self, saved):
+        state, depth = saved
+        t0 = time.perf_counter()
+        if self.Reentrant:
+            self.Lock._acquire_restore(state)
+        else:
+            self.Lock.acquire()
+        self.HoldStart = t = time.perf_counter()
+        self.WaitTime = t - t0
+        self.Contended = False
+        self.Depth = depth
+
+class LockProfiler(object):
+
+    Sort = {
+        "wait_time":        lambda p: p["wait_time"]["sum"],
+        "hold_time":        lambda p: p["hold_time"]["sum"],
+        "contended":        lambda p: p["contended"],
+        "acquisitions":     lambda p: p["acquisitions"],
+        "max_waiters":      lambda p: p["max_waiters"]
+    }
+
+    def __init__(self):
+        """Registry of the lock profiles. The module-level ``lock_profiler`` instance is used by the primitives.
+        """
+        self.Enabled = False
+        self.Lock = Lock()
+        self.Profiles = {}              # name -> LockProfile
+
+    def enable(self):
+        """Enables profiling of the primitives created from now on. Existing primitives are not affected.
+        """
+        self.Enabled = True
+
+    def disable(self):
+        """Disables profiling of the primitives created from now on. The primitives already being profiled continue
+        recording their statistics.
+        """
+        self.Enabled = False
+
+    def profile(self, name):
+        """
+        Args:
+            name (str): primitive name or kind
+
+        Returns:
+            LockProfile: the profile for the name, created if needed
+        """
+        with self.Lock:
+            profile = self.Profiles.get(name)
+            if profile is None:
+                profile = self.Profiles[name] = LockProfile(name)
+            return profile
+
+    def wrap(self, lock, name):
+        """
+        Args:
+            lock (Lock or RLock): lock to profile
+            name (str): primitive name or kind
+
+        Returns:
+            ProfiledLock: the wrapped lock, or the lock itself if it is already profiled
+        """
+        if isinstance(lock, ProfiledLock):
+            return lock
+        return ProfiledLock(lock, self.profile(name))
+
+    def reset(self):
+        """Resets the statistics of all the profiles
+        """
+        with self.Lock:
+            profiles = list(self.Profiles.values())
+        for profile in profiles:
+            profile.reset()
+
+    def report(self, sort="wait_time", top=None):
+        """
+        Args:
+            sort (str): ranking criteria: "wait_time" (total), "hold_time" (total), "contended", "acquisitions" or "max_waiters".
+                Default: "wait_time"
+            top (int): number of the top profiles to return. Default: all
+
+        Returns:
+            list: profile snapshots (see LockProfile.snapshot()), most contended first
+        """
+        with self.Lock:
+            profiles = list(self.Profiles.values())
+        snapshots = sorted((p.snapshot() for p in profiles), key=self.Sort[sort], reverse=True)
+        return snapshots if top is None else snapshots[:top]
+
+    def format_report(self, sort="wait_time", top=20):
+        """
+        Returns:
+            str: the ranked report as a text table, with the times in milliseconds
+        """
+        lines = ["%-30s %10s %10s %12s %10s %10s %10s %8s" % ("name", "acquired", "contended", "wait total", "wait p99",
+                    "hold mean", "hold p99", "waiters")]
+        def ms(v):
+            return 0.0 if v is None else v * 1000.0
+        for p in self.report(sort, top):
+            wait, hold = p["wait_time"], p["hold_time"]
+            lines.append("%-30s %10d %10d %12.3f %10.3f %10.3f %10.3f %8d" % (str(p["name"])[:30], p["acquisitions"], p["contended"],
+                    ms(wait["sum"]), ms(wait["p99"]), ms(hold["mean"]), ms(hold["p99"]), p["max_waiters"]))
+        return "\n".join(lines) + "\n"
+
+lock_profiler = LockProfiler()
@@ -1,5 +1,6 @@
 from .core import Primitive, synchronized, Timeout
 from threading import get_ident, RLock
+import asyncio
 
 class DebugLock(object):
     
@@ -175,10 +176,10 @@ class Promise(Primitive):
                 if stop:
                     break
                 if hasattr(cb, "oncomplete"):
-                    stop = not not cb.oncomplete(self.Result, self)
+                    stop = not not cb.oncomplete(self, self.Result)
         for p in self.Chained:
             p.complete(result)
-        self.wakeup()
+        self.wakeup(condition="done")
         self._cleanup()
 
     @synchronized
@@ -204,7 +205,7 @@ class Promise(Primitive):
         for p in self.Chained:
             #print("forwarding exception to the chained promise...")
             p.exception(exc_type, exc_value, exc_traceback)
-        self.wakeup()
+        self.wakeup(condition="done")
         self._cleanup()
 
     @synchronized
@@ -228,7 +229,7 @@ class Promise(Primitive):
                 for p in self.Chained:
                     p.cancel()
         self.Cancelled = True
-        self.wakeup()
+        self.wakeup(condition="done")
         self._cleanup()
 
     @synchronized
@@ -248,7 +249,7 @@ class Promise(Primitive):
         
         #print("thread %s: wait(%s)..." % (get_ident(), self))
         pred = lambda x: x.Complete or x.Cancelled or self.ExceptionInfo is not None
-        self.sleep_until(pred, self, timeout=timeout)
+        self.sleep_until(pred, self, timeout=timeout, condition="done")
         try:
             if self.Complete:
                 return self.Result
@@ -263,6 +264,28 @@ class Promise(Primitive):
         finally:
             self._cleanup()
 
+    def asyncio_future(self, loop=None):
+        """Creates an asyncio Future, which will be resolved when the promise completes, fails or gets cancelled.
+        Waiting for the future does not occupy a thread.
+
+        Args:
+            loop (asyncio.AbstractEventLoop): the loop to create the future for. Default: the running event loop
+
+        Returns:
+            asyncio.Future: the future
+        """
+        loop = loop or asyncio.get_running_loop()
+        future = loop.create_future()
+        self.addCallback(_FutureCallback(loop, future))
+        return future
+
+    def __await__(self):
+        """Makes the promise awaitable from a coroutine running in an asyncio event loop:
+
+            result = await promise
+        """
+        return self.asyncio_future().__await__()
+
     def _cleanup(self):
         self.Chained = []
         self.Callbacks = []
@@ -295,6 +318,33 @@ class Promise(Primitive):
             promises = args
         return ORPromise(promises)
     
+class _FutureCallback(object):
+
+    # Promise callback object, which forwards the promise outcome to an asyncio Future in a thread-safe way
+
+    def __init__(self, loop, future):
+        self.Loop = loop
+        self.Future = future
+
+    def deliver(self, method, *params):
+        try:
+            self.Loop.call_soon_threadsafe(self._deliver, method, params)
+        except RuntimeError:
+            pass            # the loop is closed
+
+    def _deliver(self, method, params):
+        if not self.Future.done():
+            getattr(self.Future, method)(*params)
+
+    def oncomplete(self, promise, result):
+        self.deliver("set_result", result)
+
+    def onexception(self, promise, exc_type, exc_value, exc_traceback):
+        self.deliver("set_exception", exc_value)
+
+    def oncancel(self, promise):
+        self.deliver("cancel")
+
 class ORPromise(Primitive):
     
     def __init__(self, promises):
@@ -0,0 +1,70 @@
+import time
+from collections import deque
+
+#
+# Rate limiters used by TaskQueue to admit task starts. They are not thread-safe by themselves and are expected to be
+# used under the owner's lock. Both implement:
+#
+#   delay(now) - returns 0 if a start is allowed at time "now", otherwise the time in seconds until it will be allowed
+#   consume(now) - records a start at time "now"
+#
+
+class TokenBucket(object):
+
+    def __init__(self, rate, burst=1):
+        """Token bucket rate limiter. Tokens are added to the bucket at ``rate`` per second, up to ``burst`` tokens. 
+        Each start takes one token. After a period of inactivity, up to ``burst`` starts are allowed at once.
+        
+        Args:
+            rate (int or float): sustained number of starts per second
+            burst (int): bucket size, maximum number of starts allowed at once. Default: 1
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+        self.Rate = float(rate)
+        self.Burst = burst
+        self.Tokens = float(burst)
+        self.T = time.time()
+
+    def _refill(self, now):
+        if now > self.T:
+            self.Tokens = min(self.Burst, self.Tokens + (now - self.T) * self.Rate)
+            self.T = now
+
+    def delay(self, now):
+        self._refill(now)
+        if self.Tokens >= 1.0:
+            return 0.0
+        return (1.0 - self.Tokens) / self.Rate
+
+    def consume(self, now):
+        self._refill(now)
+        self.Tokens -= 1.0
+
+class SlidingWindow(object):
+
+    def __init__(self, limit, window):
+        """Sliding window rate limiter. Allows at most ``limit`` starts within any ``window`` seconds.
+        
+        Args:
+            limit (int): maximum number of starts within the window
+            window (int or float): window length in seconds
+        """
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        self.Limit = limit
+        self.Window = window
+        self.Starts = deque()
+
+    def delay(self, now):
+        starts = self.Starts
+        while starts and starts[0] <= now - self.Window:
+            starts.popleft()
+        if len(starts) < self.Limit:
+            return 0.0
+        return starts[0] + self.Window - now
+
+    def consume(self, now):
+        self.Starts.append(now)
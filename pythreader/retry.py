@@ -0,0 +1,64 @@
+import random
+
+#
+# Retry policy used by TaskQueue for tasks which fail with an exception. A failed attempt is not retried in the worker
+# thread. Instead, the task is put back into the queue with its "after" time set to the end of the backoff interval,
+# so that a task waiting for the next attempt does not hold a thread.
+#
+
+class RetryPolicy(object):
+
+    def __init__(self, max_attempts=3, backoff=1.0, factor=2.0, max_backoff=None, jitter=0.0, retry_on=Exception):
+        """Exponential backoff retry policy. The delay before the attempt number ``n+1`` is ``backoff * factor**(n-1)``
+        seconds, capped by ``max_backoff``, where ``n`` is the number of failed attempts so far.
+
+        Args:
+            max_attempts (int): maximum number of attempts, including the first one. Default: 3
+            backoff (int or float): delay in seconds before the second attempt. Default: 1
+            factor (int or float): multiplier for the delay after each failed attempt. Default: 2
+            max_backoff (int or float): maximum delay in seconds. Default: None, no limit
+            jitter (float): between 0 and 1, the fraction of the delay to randomize. The actual delay is chosen uniformly
+                        between ``delay*(1-jitter)`` and ``delay``. Default: 0, no randomization
+            retry_on: exception class or tuple of exception classes to retry on, or a callable which receives the exception
+                        and returns True if the attempt should be retried. Default: Exception
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        if not 0.0 <= jitter <= 1.0:
+            raise ValueError("jitter must be between 0 and 1")
+        self.MaxAttempts = max_attempts
+        self.Backoff = backoff
+        self.Factor = factor
+        self.MaxBackoff = max_backoff
+        self.Jitter = jitter
+        self.RetryOn = retry_on
+
+    def should_retry(self, attempts, exc_type, exc_value):
+        """
+        Args:
+            attempts (int): number of attempts made so far, including the failed one
+            exc_type: exception type
+            exc_value: exception
+        Returns:
+            boolean: whether the task should be attempted again
+        """
+        if attempts >= self.MaxAttempts:
+            return False
+        retry_on = self.RetryOn
+        if isinstance(retry_on, type) or isinstance(retry_on, tuple):
+            return exc_type is not None and issubclass(exc_type, retry_on)
+        return bool(retry_on(exc_value))
+
+    def delay(self, attempts):
+        """
+        Args:
+            attempts (int): number of attempts made so far
+        Returns:
+            float: time in seconds to wait before the next attempt
+        """
+        delay = self.Backoff * self.Factor ** (attempts - 1)
+        if self.MaxBackoff is not None:
+            delay = min(delay, self.MaxBackoff)
+        if self.Jitter:
+            delay *= 1.0 - self.Jitter * random.random()
+        return delay
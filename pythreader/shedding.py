@@ -0,0 +1,73 @@
+import math
+
+#
+# Adaptive load shedding for TaskQueue. The queue calls should_drop() for each task it is about to start, with the time
+# the task has spent waiting. Like the other TaskQueue policy objects, it is not thread-safe by itself and is used
+# under the queue lock.
+#
+
+class CoDel(object):
+
+    def __init__(self, target=0.005, interval=0.1):
+        """Controlled Delay (CoDel) active queue management, adapted from RFC 8289. Short bursts are absorbed, but once
+        the queue wait time of the tasks stays above ``target`` for at least ``interval`` seconds, the queue starts
+        dropping tasks, at a rate increasing with the square root of the number of drops, until the wait time goes back
+        below ``target``.
+
+        Args:
+            target (int or float): acceptable standing queue wait time in seconds. Default: 0.005
+            interval (int or float): time in seconds the wait time may stay above ``target`` before dropping starts.
+                        Should be on the order of the task run time. Default: 0.1
+        """
+        self.Target = target
+        self.Interval = interval
+        self.FirstAbove = None          # time when the wait time will have been above target for "interval" seconds
+        self.Dropping = False
+        self.Count = 0                  # number of drops in the current dropping state
+        self.LastCount = 0
+        self.DropNext = 0.0
+
+    @property
+    def overloaded(self):
+        """
+        Returns:
+            boolean: whether the queue is in the dropping state
+        """
+        return self.Dropping
+
+    def _control_law(self, t):
+        return t + self.Interval / math.sqrt(self.Count)
+
+    def should_drop(self, wait_time, now):
+        """
+        Args:
+            wait_time (float): time in seconds the task has been waiting in the queue
+            now (float): current time
+        Returns:
+            boolean: whether the task should be dropped
+        """
+        if wait_time < self.Target:
+            self.FirstAbove = None
+            self.Dropping = False
+            return False
+        if self.FirstAbove is None:
+            self.FirstAbove = now + self.Interval
+            return False
+        if not self.Dropping:
+            if now < self.FirstAbove:
+                return False
+            self.Dropping = True
+            # if the dropping state was left recently, resume at about the previous drop rate
+            delta = self.Count - self.LastCount
+            if delta > 1 and now - self.DropNext < 16 * self.Interval:
+                self.Count = delta
+            else:
+                self.Count = 1
+            self.LastCount = self.Count
+            self.DropNext = self._control_law(now)
+            return True
+        if now >= self.DropNext:
+            self.Count += 1
+            self.DropNext = self._control_law(self.DropNext)
+            return True
+        return False
@@ -0,0 +1,204 @@
+import os
+from threading import Lock
+
+class Histogram(object):
+
+    def __init__(self, max_value=3600.0, resolution=1e-6, sub_bucket_bits=5):
+        """Latency histogram with fixed memory and bounded relative error, in the style of HdrHistogram. Values are counted
+        in units of ``resolution``. Each power of 2 range of values is split into ``2**sub_bucket_bits`` linear buckets,
+        so the relative error of the reported percentiles is about ``2**-sub_bucket_bits``. Values above ``max_value``
+        are counted as ``max_value``.
+
+        The histogram is not thread-safe by itself.
+
+        Args:
+            max_value (float): highest value to track, in seconds. Default: 1 hour
+            resolution (float): lowest distinguishable value, in seconds. Default: 1 microsecond
+            sub_bucket_bits (int): number of linear buckets per power of 2, as power of 2. Default: 5, 32 buckets, ~3% error
+        """
+        self.Resolution = resolution
+        self.SubBits = sub_bucket_bits
+        self.SubCount = 1 << sub_bucket_bits
+        self.MaxUnits = int(max_value / resolution)
+        self.Counts = [0] * (self._index(self.MaxUnits) + 1)
+        self.Count = 0
+        self.Sum = 0.0
+        self.Min = None
+        self.Max = None
+
+    def _index(self, units):
+        if units < 2 * self.SubCount:
+            return units
+        shift = units.bit_length() - self.SubBits - 1
+        return shift * self.SubCount + (units >> shift)
+
+    def _value(self, index):
+        # midpoint of the bucket, in seconds
+        if index < 2 * self.SubCount:
+            return (index + 0.5) * self.Resolution
+        shift = index // self.SubCount - 1
+        m = index - shift * self.SubCount
+        return ((m << shift) + (1 << shift) / 2.0) * self.Resolution
+
+    def record(self, value):
+        """
+        Args:
+            value (float): value in seconds
+        """
+        units = min(self.MaxUnits, max(0, int(value / self.Resolution)))
+        self.Counts[self._index(units)] += 1
+        self.Count += 1
+        self.Sum += value
+        if self.Min is None or value < self.Min:    self.Min = value
+        if self.Max is None or value > self.Max:    self.Max = value
+
+    def percentile(self, p):
+        """
+        Args:
+            p (float): percentile, between 0 and 100
+
+        Returns:
+            float: the value at the percentile, or None if the histogram is empty
+        """
+        if not self.Count:
+            return None
+        target = max(1, int(self.Count * p / 100.0 + 0.5))
+        n = 0
+        for index, count in enumerate(self.Counts):
+            n += count
+            if n >= target:
+                return min(max(self._value(index), self.Min), self.Max)
+        return self.Max
+
+    @property
+    def mean(self):
+        return self.Sum / self.Count if self.Count else None
+
+    def reset(self):
+        self.Counts = [0] * len(self.Counts)
+        self.Count = 0
+        self.Sum = 0.0
+        self.Min = self.Max = None
+
+    def snapshot(self, percentiles=(50, 90, 99, 99.9)):
+        """
+        Returns:
+            dict: count, sum, mean, min, max and the percentiles as "p50", "p90", etc.
+        """
+        out = {
+            "count":    self.Count,
+            "sum":      self.Sum,
+            "mean":     self.mean,
+            "min":      self.Min,
+            "max":      self.Max
+        }
+        for p in percentiles:
+            out["p%s" % (("%f" % (p,)).rstrip("0").rstrip("."),)] = self.percentile(p)
+        return out
+
+class TaskQueueStats(object):
+
+    Counters = ("started", "completed", "failed", "cancelled", "rejected", "expired", "retried")
+
+    def __init__(self):
+        """TaskQueue statistics: task counters, queue wait and run time histograms and the time spent in the delegate
+        callbacks. Updates are protected by a separate lock, so that they can be made with the queue unlocked.
+        """
+        self.Lock = Lock()
+        self.Counts = dict.fromkeys(self.Counters, 0)
+        self.QueueWait = Histogram()
+        self.RunTime = Histogram()
+        self.DelegateTime = Histogram()
+
+    def count(self, counter, n=1):
+        with self.Lock:
+            self.Counts[counter] += n
+
+    def task_started(self, wait_time):
+        with self.Lock:
+            self.Counts["started"] += 1
+            self.QueueWait.record(wait_time)
+
+    def task_ran(self, run_time):
+        with self.Lock:
+            self.RunTime.record(run_time)
+
+    def delegate_called(self, dt):
+        with self.Lock:
+            self.DelegateTime.record(dt)
+
+    def reset(self):
+        with self.Lock:
+            self.Counts = dict.fromkeys(self.Counters, 0)
+            for h in (self.QueueWait, self.RunTime, self.DelegateTime):
+                h.reset()
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: the counters and the histogram snapshots as "queue_wait", "run_time" and "delegate_time"
+        """
+        with self.Lock:
+            out = dict(self.Counts)
+            out["queue_wait"] = self.QueueWait.snapshot()
+            out["run_time"] = self.RunTime.snapshot()
+            out["delegate_time"] = self.DelegateTime.snapshot()
+        return out
+
+def _labels(labels, **more):
+    labels = dict(labels, **more)
+    if not labels:
+        return ""
+    return "{%s}" % (",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in sorted(labels.items())),)
+
+def prometheus_text(snapshot, prefix="pythreader_task_queue", labels={}):
+    """Formats a TaskQueue stats snapshot in Prometheus text exposition format. Counters are exported as "counter",
+    current values as "gauge" and histograms as "summary" with quantiles.
+
+    Args:
+        snapshot (dict): the dictionary returned by ``TaskQueue.stats()``
+        prefix (str): metric name prefix
+        labels (dict): labels to add to all the metrics, e.g. {"queue": "downloads"}
+
+    Returns:
+        str: the metrics text
+    """
+    lines = []
+    lbl = _labels(labels)
+    for name in TaskQueueStats.Counters:
+        metric = "%s_tasks_%s_total" % (prefix, name)
+        lines.append("# TYPE %s counter" % (metric,))
+        lines.append("%s%s %d" % (metric, lbl, snapshot[name]))
+    for name in ("waiting", "running", "pending"):
+        if name in snapshot:
+            metric = "%s_tasks_%s" % (prefix, name)
+            lines.append("# TYPE %s gauge" % (metric,))
+            lines.append("%s%s %d" % (metric, lbl, snapshot[name]))
+    for name in ("queue_wait", "run_time", "delegate_time"):
+        h = snapshot[name]
+        metric = "%s_%s_seconds" % (prefix, name)
+        lines.append("# TYPE %s summary" % (metric,))
+        for key, q in (("p50", "0.5"), ("p90", "0.9"), ("p99", "0.99"), ("p99.9", "0.999")):
+            if h.get(key) is not None:
+                lines.append("%s%s %.9g" % (metric, _labels(labels, quantile=q), h[key]))
+        lines.append("%s_sum%s %.9g" % (metric, lbl, h["sum"]))
+        lines.append("%s_count%s %d" % (metric, lbl, h["count"]))
+    return "\n".join(lines) + "\n"
+
+def write_text(text, dest):
+    """Writes the text to the destination
+
+    Args:
+        text (str): text to write
+        dest: callable, which will be called with the text as the argument, file-like object or file path. Files are
+            replaced atomically, so that readers like the node_exporter textfile collector never see partial files.
+    """
+    if callable(dest):
+        dest(text)
+    elif hasattr(dest, "write"):
+        dest.write(text)
+    else:
+        tmp = "%s.%d.tmp" % (dest, os.getpid())
+        with open(tmp, "w") as f:
+            f.write(text)
+        os.replace(tmp, dest)
@@ -0,0 +1,82 @@
+from .promise import Promise
+
+class TaskGraph(object):
+
+    def __init__(self):
+        """Directed acyclic graph of tasks to be submitted to a TaskQueue in one call. Each task is started when all
+        the tasks it depends on complete.
+        """
+        self.Nodes = {}             # name -> (task, params, args, depends_on)
+        self.Tasks = None
+
+    def add(self, name, task, *params, depends_on=(), **args):
+        """Adds a task to the graph
+
+        Args:
+            name (hashable): task name, unique within the graph
+            task (Task or callable): the task to run. Callables are called with ``params`` and ``args``
+            params, args: positional and keyword arguments for the callable
+            depends_on (list): names of the tasks in the graph, which must complete before the task starts. The tasks
+                may be added to the graph in any order. Default: no dependencies
+
+        Returns:
+            TaskGraph: the graph, so that calls can be chained
+        """
+        if name in self.Nodes:
+            raise ValueError("Duplicate task name: %s" % (name,))
+        self.Nodes[name] = (task, params, args, list(depends_on))
+        return self
+
+    def _order(self):
+        # returns the task names in topological order
+        indegree = {name: 0 for name in self.Nodes}
+        dependents = {name: [] for name in self.Nodes}
+        for name, (_, _, _, depends_on) in self.Nodes.items():
+            for dep in depends_on:
+                if dep not in self.Nodes:
+                    raise ValueError("Task %s depends on unknown task %s" % (name, dep))
+                indegree[name] += 1
+                dependents[dep].append(name)
+        order = [name for name, n in indegree.items() if n == 0]
+        for name in order:              # the list grows while it is being iterated
+            for dependent in dependents[name]:
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    order.append(dependent)
+        if len(order) < len(self.Nodes):
+            raise ValueError("The task graph has a cycle")
+        return order
+
+    def submit(self, queue, **args):
+        """Appends all the tasks of the graph to the queue. Each task is queued when its dependencies complete.
+
+        Args:
+            queue (TaskQueue): the queue
+            args: keyword arguments for ``queue.append()``, applied to all the tasks, e.g. ``priority`` or ``tenant``
+
+        Returns:
+            dict: {name: Task} - the tasks added to the queue
+        """
+        order = self._order()
+        tasks = self.Tasks = {}
+        for name in order:
+            task, params, task_args, depends_on = self.Nodes[name]
+            tasks[name] = queue.append(task, *params, depends_on=[tasks[dep] for dep in depends_on], **dict(args, **task_args))
+        return tasks
+
+    def wait(self, timeout=None):
+        """Waits for all the submitted tasks to complete
+
+        Args:
+            timeout (int or float): time-out in seconds. Default: wait indefinitely
+
+        Returns:
+            dict: {name: result}
+
+        Raises:
+            the exception of the first failed task, which may be DependencyFailed for the dependents of a failed task
+        """
+        if self.Tasks is None:
+            raise RuntimeError("The graph has not been submitted")
+        results = Promise.all([task.promise for task in self.Tasks.values()]).wait(timeout)
+        return dict(zip(self.Tasks.keys(), results))
@@ -1,9 +1,15 @@
-import time, traceback, sys
+import time, traceback, sys, heapq, itertools, os, asyncio
 from datetime import datetime, timedelta
-from .core import Primitive, PyThread, synchronized
+from .core import Primitive, PyThread, synchronized, timer_service, DeadlineExceeded, TaskRejected, DependencyFailed
+from .cancellation import CancellationToken
+from .promise import Promise, _FutureCallback
 from .dequeue import DEQueue
-from .promise import Promise
-from threading import Timer
+from .executors import ThreadExecutor, ProcessExecutor, InterpreterExecutor
+from .aio import default_event_loop
+from .ratelimit import TokenBucket, SlidingWindow
+from .policies import Policies
+from .stats import TaskQueueStats, prometheus_text, write_text
+from collections import deque, OrderedDict
 
 class TaskQueueDelegate(object):
     
@@ -20,6 +26,13 @@ class TaskQueueDelegate(object):
 
     def taskFailed(self, queue, task, exc_type, exc_value, tback):
         pass
+
+    def taskWillRetry(self, queue, task, exc_type, exc_value, tback, delay):
+        # return False to fail the task instead of retrying it
+        pass
+
+    def taskRejected(self, queue, task, wait_time):
+        pass
         
 def _after_time(after):
     if after is None:   return None
@@ -55,11 +68,42 @@ class Task(Primitive):
         self._Private.After = None
         self._Private.Running = False               # True actually means that the Executor thread was created and about to be started
         self._Private.LastStart = None
+        self._Private.LastEnd = None
         self._Private.Cancelled = False
+        self._Private.Queue = None                  # the TaskQueue the task is waiting or running in
+        self._Private.Waiting = 0                   # number of times the task is waiting in the queue
+        self._Private.Priority = 0
+        self._Private.Cost = None                   # run time estimate for the SJF policy
+        self._Private.Front = False                 # True if the task was inserted rather than appended
+        self._Private.Key = None                    # concurrency limit key
+        self._Private.Tenant = None                 # fair share scheduling tenant
+        self._Private.KeyReady = 0                  # number of times the task holds a slot of its key in the ready heap
+        self._Private.KeyBacklog = 0                # number of times the task is waiting for a slot of its key
+        self._Private.DedupKey = None
+        self._Private.Retry = None                  # RetryPolicy
+        self._Private.Attempts = 0                  # number of attempts of the current run
+        self._Private.Deadline = None
+        self._Private.RunTimeout = None
+        self._Private.Expiry = None                 # TimerService entry for the deadline or the run time-out
+        self._Private.Expired = False
+        self._Private.Delivered = False
+        self._Private.Pending = 0                   # number of dependencies the task is waiting for
+        self._Private.Token = None                  # CancellationToken, created on demand
 
     def __repr__(self):
         return str(self)
 
+    def __getstate__(self):
+        # locks, the promise and the queue bookkeeping stay in the process where the task was created
+        state = self.__dict__.copy()
+        for name in ("_Lock", "_Condition", "_Conditions", "_GateSemaphore", "Timer", "_Private"):
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        Task.__init__(self, name=state.get("Name"))
+        self.__dict__.update(state)
+
     @property
     def promise(self):
         """
@@ -68,36 +112,73 @@ class Task(Primitive):
         """
         return self._Private.Promise
         
-    @synchronized
     def deliver_promise(self, result=None):
-        promise = self._Private.Promise
-        if promise is not None:
-            if self.is_cancelled:
-                promise.cancel()
-            else:
-                promise.complete(result)
-            self._Private.Promise = None
+        with self:
+            promise = self._Private.Promise
+            if promise is None or self._Private.Expired:        # the promise of an expired task is failed by the queue
+                return
+            self._Private.Delivered = True
+            cancelled = self.is_cancelled
+        # deliver with the task unlocked, the promise callbacks may lock the queue
+        if cancelled:
+            promise.cancel()
+        else:
+            promise.complete(result)
+        # keep the promise so that task.promise remains valid after the task ends
 
-    @synchronized
     def cancel(self):
         """
         Cancels the task. If the task is alreadt running, it will not be interrupted. Otherwise, it will be removed from any
         TaskQueue the task was added to. The task promise will be cancelled.
         """
-        if not self._Private.Cancelled:
+        with self:
+            if self._Private.Cancelled:
+                return
             self._Private.Cancelled = True
+            queue = self._Private.Queue
             promise = self.promise
-            if promise is not None:
-                promise.cancel()
+            token = self._Private.Token
+        # notify the queue outside of the task lock to avoid lock order inversion with the queue
+        if queue is not None:
+            queue.task_cancelled(self)
+        if token is not None:
+            token.cancel()
+        if promise is not None and not (promise.Complete or promise.ExceptionInfo):
+            promise.cancel()
 
     @property
     def is_cancelled(self):
         """
         Returns:
-            boolean: whether the task is cancelled
+            boolean: whether the task is cancelled. Expired tasks are cancelled too
         """
         return self._Private.Cancelled
 
+    @property
+    def is_expired(self):
+        """
+        Returns:
+            boolean: whether the task deadline or run time-out has passed before the task ended
+        """
+        return self._Private.Expired
+
+    @property
+    def token(self):
+        """
+        Returns:
+            CancellationToken: the token, which will be cancelled when the task is cancelled or expires. Tasks can poll it
+            or wait on it to stop early.
+        """
+        with self:
+            token = self._Private.Token
+            if token is not None:
+                return token
+            token = self._Private.Token = CancellationToken()
+            cancelled, expired = self._Private.Cancelled, self._Private.Expired
+        if cancelled:
+            token.cancel(DeadlineExceeded("task deadline exceeded") if expired else None)
+        return token
+
     @synchronized
     def repeat(self, after=None, count=1, interval=0):
         if not self._Private.Cancelled:
@@ -117,6 +198,26 @@ class Task(Primitive):
         """
         return self.Started is not None
 
+    @property
+    def run_time(self):
+        """
+        Returns:
+            float: duration of the last run of the task in seconds, or None if the task has not ended
+        """
+        started, ended = self._Private.LastStart, self._Private.LastEnd
+        if started is None or ended is None:
+            return None
+        return ended - started
+
+    @property
+    def attempts(self):
+        """
+        Returns:
+            int: number of attempts made to run the task, including the current one. For repeating tasks, the count
+            is reset after each successful run.
+        """
+        return self._Private.Attempts
+
     @property
     def is_running(self):
         """
@@ -150,6 +251,7 @@ class Task(Primitive):
         if self.Started is None:    self.Started = t
         if self._Private.RunCount is not None:
             self._Private.RunCount -= 1
+        self._Private.Attempts += 1
         self._Private.LastStart = t
         self._Private.LastEnd = None
 
@@ -157,8 +259,8 @@ class Task(Primitive):
     def _ended(self):
         self._Private.LastEnd = self.Ended = time.time()
 
-    def _queued(self):
-        self.Queued = time.time()
+    def _queued(self, t=None):
+        self.Queued = t or time.time()
 
     def __rshift__(self, queue):
         if not isinstance(queue, TaskQueue):
@@ -189,7 +291,138 @@ class FunctionTask(Task):
         result = self.F(*self.Params, **self.Args)
         #self.F = self.Params = self.Args = None
         return result
+
+class _CachedResultTask(Task):
+
+    # returned by TaskQueue.append() for a dedup_key found in the result cache. The task is never queued,
+    # its promise is complete from the start
+
+    def __init__(self, result, promise_data=None):
+        Task.__init__(self)
+        self.Result = result
+        self._Private.Promise = Promise(data=promise_data)
+        self._Private.Promise.complete(result)
+
+    def run(self):
+        return self.Result
+
+class CoroutineTask(FunctionTask):
+
+    # Task created for a coroutine function. TaskQueue runs tasks with a coroutine run() method on an asyncio event loop
+    # instead of a thread. A Task subclass can define "async def run(self)" as well.
+
+    async def run(self):
+        return await self.F(*self.Params, **self.Args)
         
+def _map_chunk(fcn, chunk):
+    return [fcn(item) for item in chunk]
+
+def _map_results(promises, chunked):
+    for promise in promises:
+        if chunked:
+            yield from promise.wait()
+        else:
+            yield promise.wait()
+
+class _ConsumeIterator(object):
+
+    # Keeps at most Window items pulled from the input iterator and not yet returned to the caller.
+    # The next item is pulled only when a result is returned and its slot is freed.
+
+    def __init__(self, queue, items, fcn, window, prefetch, ordered, priority):
+        self.Queue = queue
+        self.Items = items
+        self.F = fcn
+        self.Window = window            # fixed window or None to follow the queue concurrency limit
+        self.Prefetch = prefetch
+        self.Ordered = ordered
+        self.Priority = priority
+        self.InFlight = 0
+        self.Exhausted = False
+        self.Pending = deque()          # ordered mode: promises in the order of the items
+        self.Done = DEQueue()           # unordered mode: promises in the order they were delivered
+        self.fill()
+
+    def window(self):
+        if self.Window is not None:
+            return self.Window
+        limit = self.Queue.limit        # may change with adaptive concurrency
+        if limit is None:
+            limit = self.Queue.UnlimitedConsumeWindow
+        return max(1, limit + self.Prefetch)
+
+    def fill(self):
+        window = self.window()
+        while not self.Exhausted and self.InFlight < window:
+            try:    item = next(self.Items)
+            except StopIteration:
+                self.Exhausted = True
+                self.Items = None
+                break
+            promise = self.Queue.append(self.F, item, priority=self.Priority).promise
+            self.InFlight += 1
+            if self.Ordered:
+                self.Pending.append(promise)
+            else:
+                done = self.Done
+                promise.oncomplete(lambda p, result: done.append(p))
+                promise.onexception(lambda p, *exc_info: done.append(p))
+                promise.oncancel(done.append)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.InFlight:
+            raise StopIteration()
+        promise = self.Pending.popleft() if self.Ordered else self.Done.pop()
+        self.InFlight -= 1
+        self.fill()
+        return promise.wait()
+
+class _KeyState(object):
+
+    # per-key concurrency limit state. NReady + NRunning tasks hold the key slots. Tasks waiting for a slot are kept
+    # in the Backlog heap ordered the same way as the queue's ready heap
+
+    __slots__ = ("Limit", "NReady", "NRunning", "NBacklog", "Backlog")
+
+    def __init__(self, limit):
+        self.Limit = limit
+        self.NReady = self.NRunning = self.NBacklog = 0
+        self.Backlog = []
+
+class _DependencyCallback(object):
+
+    # promise callback added to the promises of the task dependencies
+
+    def __init__(self, queue, task):
+        self.Queue = queue
+        self.Task = task
+
+    def oncomplete(self, promise, result):
+        self.Queue._dependency_done(self.Task)
+
+    def onexception(self, promise, exc_type, exc_value, tb):
+        self.Queue._dependency_failed(self.Task, exc_type, exc_value, tb)
+
+    def oncancel(self, promise):
+        self.Task.cancel()
+
+class _TenantState(object):
+
+    # per-tenant fair share scheduling state. Deficit round robin: each time the tenant comes up in the round robin,
+    # its deficit grows by its weight, and it can start one task per unit of deficit.
+
+    __slots__ = ("Weight", "Ready", "Deficit", "Active", "NRunning", "NStarted", "NEnded")
+
+    def __init__(self, weight):
+        self.Weight = weight
+        self.Ready = []                 # heap of ready tasks, ordered the same way as the queue's ready heap
+        self.Deficit = 0.0
+        self.Active = False             # whether the tenant is in the round robin
+        self.NRunning = self.NStarted = self.NEnded = 0
+
 class TaskQueue(Primitive):
     
     class ExecutorThread(PyThread):
@@ -200,40 +433,47 @@ class TaskQueue(Primitive):
             task._Private.Running = True
             
         def run(self):
-            task = self.Task
-            task._started()             # this will decrement RunCount
-            repeat = False
             try:
-                if callable(task):
-                    result = task()
-                else:
-                    result = task.run()
-                task._ended()
-                #print(task._Private.__dict__)
-                repeat = task.to_be_repeated() \
-                    and self.Queue.taskWillRepeat(task, result, task._Private.After, task._Private.RunCount) is not False
-                #print("repeat:", repeat)
-                if repeat:
-                    interval = task._Private.RepeatInterval or 0
-                    task._Private.After = (task._Private.LastStart if task._Private.After is None else task._Private.After) + interval
-                else:
-                    task.deliver_promise(result)
-                    self.Queue.taskEnded(task, result)
-            except:
-                exc_type, value, tb = sys.exc_info()
-                traceback.print_exc()
-                task._ended()
-                promise = task.promise
-                if promise is not None:
-                    promise.exception(exc_type, value, tb)
-                self.Queue.taskFailed(self.Task, exc_type, value, tb)
+                self.Queue.run_task(self.Task)
+            finally:
+                self.Queue = self.Task = None
+
+    class WorkerThread(PyThread):
+        # long-lived pool worker. The queue assigns tasks to idle workers, the worker runs them one at a time
+        # and exits after being idle for longer than idle_timeout
+        def __init__(self, queue, idle_timeout):
+            PyThread.__init__(self, daemon=True)
+            self.Queue = queue
+            self.IdleTimeout = idle_timeout
+            self.Task = None
+
+        def assign(self, task):
+            # must be called while the queue is locked
+            with self:
+                task._Private.Running = True
+                self.Task = task
+                self.wakeup()
+
+        def run(self):
+            queue = self.Queue
+            try:
+                while True:
+                    with self:
+                        if self.Task is None and not self.Stop:
+                            self.sleep(self.IdleTimeout)
+                        task = self.Task
+                    if task is not None:
+                        queue.run_task(task, self)
+                    elif queue.retire_worker(self):
+                        break
             finally:
-                task._Private.Running = False
-                self.Queue.threadEnded(task, repeat)
-                self.Queue = None
+                self.Queue = self.Task = None
 
     def __init__(self, nworkers=None, capacity=None, stagger=0.0, tasks = [], delegate=None, 
-                        name=None):
+                        name=None, pool=False, idle_timeout=60.0, aging=0.0, executor="thread", loop=None,
+                        rate=None, burst=1, window=None, concurrency=None, key_limit=None, key_limits={},
+                        dedup_cache_size=0, dedup_cache_ttl=None, max_queue_wait=None, codel=None, tenant_weights={},
+                        policy="fifo", stats=True):
         """Initializes the TaskQueue object
         
         Args:
@@ -247,60 +487,726 @@ class TaskQueue(Primitive):
             delegate (object): an object to receive callbacks with task status updates. If None, updates will not be sent.
             name (string): primitive name
             daemon (boolean): Threading daemon flag for the queue internal thread. Default = True
+            pool (boolean): run tasks on a pool of long-lived worker threads instead of creating a new thread for each task run.
+                        Default: False
+            idle_timeout (int or float): in pool mode, time in seconds after which an idle worker thread exits. If None, idle workers
+                        never exit. Default: 60 seconds
+            aging (int or float): rate at which the priority of a waiting task grows, in priority units per second of waiting.
+                        Aging keeps low priority tasks from starving behind a steady stream of higher priority ones. Default: 0, no aging
+            executor (str or object): where to run the tasks:
+                        "thread" - in the queue's threads (default),
+                        "process" - in a pool of ``nworkers`` worker processes. The tasks must be picklable.
+                        "interpreter" - in a pool of ``nworkers`` subinterpreters, on Python 3.14+. Falls back to "process" on
+                                        older versions.
+                        Otherwise, an object with ``call(task)`` and ``shutdown(wait)`` methods, e.g. ``ProcessExecutor``
+            loop (asyncio.AbstractEventLoop): event loop to run coroutine tasks on. Coroutine tasks count against ``nworkers``,
+                        but do not occupy a thread while running. Default: the loop run by the pythreader event loop thread,
+                        started on first use
+            rate (int or float): maximum sustained rate of task starts per second, enforced with a token bucket. Unlike ``stagger``,
+                        allows bursts of up to ``burst`` starts after a period of inactivity. Default: no limit
+            burst (int): token bucket size for ``rate``. Default: 1
+            window (tuple): (limit, seconds) - allow at most ``limit`` task starts within any ``seconds`` long sliding window.
+                        Default: no limit
+            concurrency (object): adaptive concurrency limit, e.g. ``AIMDLimit`` or ``GradientLimit``, which adjusts the number of
+                        tasks running concurrently based on the task run times and failures. If ``nworkers`` is also specified,
+                        it caps the adaptive limit. Default: None, the limit is fixed at ``nworkers``
+            key_limit (int): maximum number of concurrently running tasks with the same ``key``, see append(). Default: no limit
+            key_limits (dict): per-key limits, overriding ``key_limit`` for the keys in the dictionary
+            dedup_cache_size (int): number of results of recently completed tasks with ``dedup_key`` to keep, see append(). 
+                        Default: 0, do not cache results
+            dedup_cache_ttl (int or float): time in seconds to keep cached results. Default: None, until evicted by newer results
+            max_queue_wait (int or float): queue wait time budget in seconds. A task which has been waiting longer than that
+                        when it comes up to start is dropped and its promise fails with TaskRejected. Default: no limit
+            codel (CoDel): adaptive load shedding policy, which drops tasks when the queue wait time stays above its target.
+                        Dropped tasks are rejected the same way as with ``max_queue_wait``. Default: None
+            tenant_weights (dict): fair share weights of the tenants, see append(). Default weight is 1
+            policy (str or object): order in which the waiting tasks with the same priority start:
+                        "fifo" - in the order they were added, adjusted by ``aging`` (default)
+                        "edf" - earliest deadline first, by the task ``deadline``
+                        "sjf" - shortest job first, by the task ``cost`` or the learned mean run time of the task function
+                        or a policy object, e.g. ``SJFPolicy(alpha=0.5)``
+            stats (boolean): collect task counters and queue wait, run time and delegate call time histograms, see stats().
+                        Default: True
         """
         Primitive.__init__(self, name=name)
         self.NWorkers = nworkers
-        self.Queue = DEQueue(capacity)
+        self.Capacity = capacity
+        self.RoomWaiters = []           # _FutureCallback objects of the coroutines waiting for room in the queue, see submit_async()
+        self.Ready = []                 # heap of (aging*t - priority, seq, task) for tasks ready to start
+        self.Aging = aging
+        self.Delayed = []               # heap of (after, seq, task) for tasks not to start before "after"
+        self.Running = set()
+        self.NRunning = 0
+        self.NWaiting = 0               # live counter of the tasks in self.Ready and self.Delayed, excluding cancelled ones
+        self.NPending = 0               # number of tasks waiting for their dependencies
+        self.Seq = itertools.count()
         self.Held = False
         self.Stagger = stagger
         self.LastStart = 0.0
-        self.StartTimer = None
+        self.StartTimer = None          # TimerService entry for the next deferred start_tasks() call
+        self.StartTime = None
         self.Delegate = delegate
         self.Stop = False
+        self.Pool = pool
+        self.IdleTimeout = idle_timeout
+        self.IdleWorkers = []           # stack, so that the most recently used workers are reused first
+        self.NWorkerThreads = 0
+        if executor == "thread":
+            executor = ThreadExecutor()
+        elif executor == "process":
+            executor = ProcessExecutor(nworkers)
+        elif executor == "interpreter":
+            executor = InterpreterExecutor(nworkers)
+        elif isinstance(executor, str):
+            raise ValueError("Unknown executor type: %s" % (executor,))
+        self.Executor = executor
+        self.Loop = loop
+        self.Concurrency = concurrency
+        self.KeyLimit = key_limit
+        self.KeyLimits = dict(key_limits)
+        self.Keys = {}                  # key -> _KeyState for keys with limits and tasks waiting or running
+        self.InFlight = {}              # dedup_key -> task waiting or running
+        self.DedupCache = OrderedDict() # dedup_key -> (expiration time or None, result), in LRU order
+        self.DedupCacheSize = dedup_cache_size
+        self.DedupCacheTTL = dedup_cache_ttl
+        self.MaxQueueWait = max_queue_wait
+        self.CoDel = codel
+        self.QueueWait = 0.0            # queue wait time of the last task taken from the queue
+        self.TenantWeights = {}
+        self.Tenants = {}               # tenant -> _TenantState, empty until the first task with a tenant is added
+        self.ActiveTenants = deque()    # round robin of the tenants with ready tasks
+        for tenant, weight in tenant_weights.items():
+            self.set_tenant_weight(tenant, weight)
+        if isinstance(policy, str):
+            if policy not in Policies:
+                raise ValueError("Unknown scheduling policy: %s" % (policy,))
+            policy = Policies[policy]
+            policy = policy and policy()
+        self.Policy = policy            # None for FIFO
+        self.Stats = TaskQueueStats() if stats else None
+        self.RateLimiters = []
+        if rate is not None:
+            self.RateLimiters.append(TokenBucket(rate, burst))
+        if window is not None:
+            self.RateLimiters.append(SlidingWindow(*window))
         for t in tasks:
             self.addTask(t)
         
-    def stop(self):
+    def stop(self, cancel_running=False):
         """Stops the queue. Any attempt to add any new tasks will cause an exception. All running
-        tasks will continue running, but new tasks will not start."""
+        tasks will continue running, but new tasks will not start.
+        
+        Args:
+            cancel_running (boolean): cancel the running tasks, so that their cancellation tokens are signalled. Default: False
+        """
         self.Stop = True
-        self.Queue.close()
-        self.cancel_alarm()
+        if cancel_running:
+            for task in self.activeTasks():
+                task.cancel()
+        self.set_start_timer(None)
+        self.Executor.shutdown(wait=False)
+        with self:
+            self._notify()              # unblock those waiting for room in the queue
+            idle, self.IdleWorkers = self.IdleWorkers, []
+            for worker in idle:
+                with worker:
+                    worker.stop()
+                    worker.wakeup()
         
-    def __add(self, mode, task, *params,
-            timeout=None, promise_data=None, force=False,
-            count = None, interval = None, after=None,
-            **args):
-
+    def _prepare_task(self, mode, task, params, args, promise_data=None, count=None, interval=None, after=None, priority=0,
+                key=None, retry=None, deadline=None, run_timeout=None, tenant=None, cost=None):
         if interval is None and count is None:
             count = 1
         
         if not isinstance(task, Task):
-            if callable(task):
+            if asyncio.iscoroutinefunction(task):
+                task = CoroutineTask(task, *params, **args)
+            elif callable(task):
                 task = FunctionTask(task, *params, **args)
             else:
-                raise ArgumentError("The task argument must be either a callable or a Task subclass instance")
-
-        task._Private.Promise = promise = Promise(data=promise_data)
+                raise TypeError("The task argument must be either a callable or a Task subclass instance")
 
+        task._Private.Promise = Promise(data=promise_data)
         task._Private.RunCount = count
         task._Private.RepeatInterval = _time_interval(interval)
         task._Private.After = _after_time(after)
+        task._Private.Priority = priority
+        task._Private.Front = mode == "insert"
+        task._Private.Key = key
+        task._Private.Tenant = tenant
+        task._Private.Cost = cost
+        task._Private.Retry = retry
+        task._Private.Attempts = 0
+        task._Private.Deadline = _after_time(deadline)
+        task._Private.RunTimeout = _time_interval(run_timeout)
+        task._Private.Delivered = False
+        return task
 
-        if mode == "insert":
-            self.Queue.insert(task, timeout = timeout, force=force)
-        else:           # mode == "append"
-            self.Queue.append(task, timeout = timeout, force=force)
-        task._queued()
-        self.start_tasks()
+    def _add_prepared(self, task, now):
+        # must be called from a synchronized method !
+        if task.is_cancelled:
+            task.promise.cancel()
+        else:
+            task._queued(now)
+            self._enqueue(task, now)
+            if task._Private.Deadline is not None:
+                self._arm_expiry(task, task._Private.Deadline)
+
+    def _arm_expiry(self, task, t):
+        # must be called from a synchronized method !
+        task._Private.Expiry = timer_service().reschedule(task._Private.Expiry, t, self._expire_task, task)
+
+    def _disarm_expiry(self, task):
+        # must be called from a synchronized method !
+        if task._Private.Expiry is not None:
+            timer_service().cancel(task._Private.Expiry)
+            task._Private.Expiry = None
+
+    def _expire_task(self, task):
+        # TimerService callback, called when the task deadline or run time-out passes before the task ended
+        with task:
+            first = not task._Private.Expired
+            if first:
+                if task._Private.Cancelled or task._Private.Delivered:
+                    return
+                task._Private.Expired = task._Private.Cancelled = True
+            token = task._Private.Token
+        with self:
+            task._Private.Expiry = None
+            if first:
+                self._remove_waiting(task)
+                self._dedup_done(task)
+                if self.Stats is not None:
+                    self.Stats.count("expired")
+                if self._release_slot(task):
+                    self._notify(1)
+                    self.start_tasks()
+        promise = task.promise
+        if promise is None or promise.Complete or promise.ExceptionInfo or promise.Cancelled:
+            return
+        exc = DeadlineExceeded("task deadline exceeded")
+        if token is not None:
+            token.cancel(exc)
+        promise.exception(DeadlineExceeded, exc, None)
+        self.taskFailed(task, DeadlineExceeded, exc, None)
+
+    def _release_slot(self, task):
+        # must be called from a synchronized method !
+        # removes the task from the running set. Returns False if it was already removed when the task expired
+        if task not in self.Running:
+            return False
+        self.Running.discard(task)
+        self.NRunning -= 1
+        ts = self.Tenants.get(task._Private.Tenant) if self.Tenants else None
+        if ts is not None:
+            ts.NRunning = max(0, ts.NRunning - 1)
+            ts.NEnded += 1
+        key = task._Private.Key
+        if key is not None:
+            ks = self.Keys.get(key)
+            if ks is not None:
+                ks.NRunning = max(0, ks.NRunning - 1)
+                self._key_released(key, ks)
+        return True
+
+    def __add(self, mode, task, *params, depends_on=None, **args):
+        promises = None
+        if depends_on:
+            promises = []
+            for dependency in depends_on:
+                promise = dependency.promise if isinstance(dependency, Task) else dependency
+                if not isinstance(promise, Promise):
+                    raise TypeError("Dependencies must be Task or Promise objects. Tasks must be added to a queue first")
+                promises.append(promise)
+        task, added = self.__add_locked(mode, task, *params, pending=len(promises or ()), **args)
+        if added and promises:
+            # add the callbacks with the queue unlocked, because they are called with the dependency promise locked
+            callback = _DependencyCallback(self, task)
+            for promise in promises:
+                promise.addCallback(callback)
+            self._dependency_done(task)         # remove the extra count held while the callbacks were being added
         return task
 
+    @synchronized
+    def __add_locked(self, mode, task, *params,
+            timeout=None, promise_data=None, force=False,
+            count = None, interval = None, after=None, priority=0, key=None, dedup_key=None, retry=None,
+            deadline=None, run_timeout=None, tenant=None, cost=None, pending=0, **args):
+        # returns (task, added), where added is False if an existing task was returned because of dedup_key
+
+        if dedup_key is not None:
+            existing = self._dedup(dedup_key, promise_data)
+            if existing is not None:
+                return existing, False
+        task = self._prepare_task(mode, task, params, args, promise_data=promise_data, count=count, interval=interval, 
+                    after=after, priority=priority, key=key, retry=retry, deadline=deadline, run_timeout=run_timeout,
+                    tenant=tenant, cost=cost)
+        if not force:
+            self._wait_for_room(timeout)
+            if dedup_key is not None:
+                # the lock was released while waiting for room
+                existing = self._dedup(dedup_key, promise_data)
+                if existing is not None:
+                    return existing, False
+        if self.Stop:
+            raise RuntimeError("Queue is closed")
+        if pending:
+            task._Private.Pending = pending + 1
+            task._Private.Queue = self
+            self.NPending += 1
+            if task._Private.Deadline is not None:
+                self._arm_expiry(task, task._Private.Deadline)
+        else:
+            self._add_prepared(task, time.time())
+        if dedup_key is not None and not task.is_cancelled:
+            task._Private.DedupKey = dedup_key
+            self.InFlight[dedup_key] = task
+        self.start_tasks()
+        return task, True
+
+    @synchronized
+    def _dependency_done(self, task):
+        # called when a dependency of the task completes. Queues the task when the last one completes
+        if task._Private.Pending <= 0:
+            return                  # the task was cancelled or failed
+        task._Private.Pending -= 1
+        if not task._Private.Pending:
+            self.NPending -= 1
+            self._add_prepared(task, time.time())
+            self.start_tasks()
+
+    def _dependency_failed(self, task, exc_type, exc_value, tb):
+        # called when a dependency of the task fails. The task fails without starting
+        with self:
+            if task._Private.Pending <= 0:
+                return
+            task._Private.Pending = 0
+            self.NPending -= 1
+            self._dedup_done(task)
+            self._disarm_expiry(task)
+            task._Private.Queue = None
+            self._notify(0)
+        exc = DependencyFailed("task dependency failed: %s" % (exc_value,))
+        exc.__cause__ = exc_value
+        promise = task.promise
+        if promise is not None:
+            promise.exception(DependencyFailed, exc, None)
+        if self.Stats is not None:
+            self.Stats.count("failed")
+        self.call_delegate("taskFailed", self, task, DependencyFailed, exc, None)
+
+    def _dedup(self, dedup_key, promise_data):
+        # must be called from a synchronized method !
+        # returns the task waiting or running with the same dedup_key, or a completed task with the cached result, or None
+        task = self.InFlight.get(dedup_key)
+        if task is not None:
+            return task
+        cached = self.DedupCache.get(dedup_key)
+        if cached is not None:
+            expiration, result = cached
+            if expiration is None or expiration > time.time():
+                self.DedupCache.move_to_end(dedup_key)
+                return _CachedResultTask(result, promise_data)
+            del self.DedupCache[dedup_key]
+        return None
+
+    def _dedup_done(self, task):
+        # must be called from a synchronized method !
+        dedup_key = task._Private.DedupKey
+        if dedup_key is not None:
+            task._Private.DedupKey = None
+            if self.InFlight.get(dedup_key) is task:
+                del self.InFlight[dedup_key]
+
+    @synchronized
+    def _cache_result(self, dedup_key, result):
+        cache = self.DedupCache
+        cache[dedup_key] = (None if self.DedupCacheTTL is None else time.time() + self.DedupCacheTTL, result)
+        cache.move_to_end(dedup_key)
+        while len(cache) > self.DedupCacheSize:
+            cache.popitem(last=False)
+
+    @synchronized
+    def clear_dedup_cache(self):
+        """
+        Discards all cached results of the tasks with ``dedup_key``
+        """
+        self.DedupCache.clear()
+
+    @synchronized
+    def extend(self, tasks, timeout=None, promise_data=None, after=None, force=False, count=None, interval=None, priority=0,
+                key=None, tenant=None, cost=None):
+        """Appends multiple tasks to the queue. Unlike calling append() for each task, the queue is locked once
+        and the tasks are started in a single pass after all of them are added.
+        If the queue reaches its capacity, the method will block until there is room for the next task.
+
+        Args:
+            tasks (iterable): Task subclass instances or callables to be added to the queue
+
+        Keyword Arguments:
+            timeout (int or float): time to block waiting for room in the queue for the whole batch. Default: block indefinitely.
+            promise_data, after, force, count, interval, priority, key, tenant, cost: same as for append(), applied to all the tasks
+
+        Returns:
+            ANDPromise: combined promise for all the tasks. Its wait() method returns the list of results in the order of the tasks.
+
+        Raises:
+            RuntimeError: the queue is closed or the timeout expired
+        """
+        if self.Stop:
+            raise RuntimeError("Queue is closed")
+        t1 = None if timeout is None else time.time() + timeout
+        promises = []
+        now = time.time()
+        for task in tasks:
+            task = self._prepare_task("append", task, (), {}, promise_data=promise_data, count=count, interval=interval, 
+                        after=after, priority=priority, key=key, tenant=tenant, cost=cost)
+            if not force and self.Capacity is not None and self.NWaiting + self.NRunning >= self.Capacity:
+                self._wait_for_room(None if t1 is None else t1 - time.time())
+                if self.Stop:
+                    raise RuntimeError("Queue is closed")
+                now = time.time()
+            self._add_prepared(task, now)
+            promises.append(task.promise)
+        self.start_tasks()
+        return Promise.all(promises)
+
+    def map(self, fcn, iterable, chunksize=1, timeout=None, priority=0):
+        """Applies the function to each item of the iterable using the queue. All the items are submitted to the queue
+        in a single batch by the time the method returns.
+
+        Args:
+            fcn (callable): function to call with each item as the only argument
+            iterable (iterable): items to process
+            chunksize (int): number of items to process sequentially by a single task. Larger chunks reduce the per-task overhead.
+                Default: 1
+
+        Keyword Arguments:
+            timeout (int or float): time to block waiting for room in the queue. Default: block indefinitely.
+            priority (int or float): priority for the tasks. Default: 0
+
+        Returns:
+            iterator: results in the order of the items. If processing of an item raised an exception, the exception will
+                be raised by the iterator when it reaches the item.
+        """
+        if chunksize is None or chunksize < 1:
+            raise ValueError("chunksize must be a positive integer")
+        if chunksize == 1:
+            tasks = (FunctionTask(fcn, item) for item in iterable)
+        else:
+            items = iter(iterable)
+            tasks = (FunctionTask(_map_chunk, fcn, chunk)
+                        for chunk in iter(lambda: list(itertools.islice(items, chunksize)), []))
+        promises = self.extend(tasks, timeout=timeout, priority=priority).Promises
+        return _map_results(promises, chunksize > 1)
+
+    UnlimitedConsumeWindow = 64         # number of items consume() runs at once if the queue concurrency is unlimited
+
+    def consume(self, iterable, fcn, prefetch=1, ordered=False, priority=0, window=None):
+        """Applies the function to each item of the iterable, pulling the items lazily. Unlike map(), the items are not
+        read from the iterable all at once. The next item is read only when a slot frees up, so that at most
+        limit + prefetch items are held in memory, including those processed but not yet returned to the caller.
+        The limit is the current concurrency limit of the queue (see ``limit``), which may change if the queue uses
+        adaptive concurrency, or ``UnlimitedConsumeWindow`` (64) if the queue concurrency is unlimited.
+
+        Args:
+            iterable (iterable): items to process, typically a generator
+            fcn (callable): function to call with each item as the only argument
+
+        Keyword Arguments:
+            prefetch (int): number of items to keep waiting in the queue in addition to the running ones. Default: 1
+            ordered (boolean): return the results in the order of the items. Otherwise, return them as they become available.
+                Default: False
+            priority (int or float): priority for the tasks. Default: 0
+            window (int): maximum number of items pulled from the iterable and not yet returned, overrides the default
+                limit + prefetch. Default: None
+
+        Returns:
+            iterator: results. If processing of an item raised an exception, the exception will be raised by the iterator
+                when it reaches the item.
+        """
+        return _ConsumeIterator(self, iter(iterable), fcn, window, prefetch, ordered, priority)
+
+    def _full(self):
+        # must be called from a synchronized method !
+        return self.Capacity is not None and self.NWaiting + self.NRunning >= self.Capacity
+
+    def _wait_for_room(self, timeout):
+        # must be called from a synchronized method !
+        t1 = None if timeout is None else time.time() + timeout
+        while self._full() and not self.Stop:
+            dt = None
+            if t1 is not None:
+                dt = t1 - time.time()
+                if dt <= 0:
+                    raise RuntimeError("Operation timed-out")
+            # make sure the queue is moving before going to sleep
+            self.start_tasks()
+            self.sleep(dt, condition="room")
+
+    def _notify(self, freed=None):
+        # must be called from a synchronized method !
+        # wakes up the threads waiting for room in the queue, for the running tasks to end and for the queue to be empty,
+        # each on its own condition. freed - number of freed queue slots, None - wake up all the threads waiting for room
+        if freed is None:
+            self.wakeup(condition="room")
+        elif freed > 0:
+            self.wakeup(condition="room", all=False, n=freed)
+        if self.RoomWaiters and (freed is None or freed > 0):
+            waiters = self.RoomWaiters
+            n = len(waiters) if freed is None else freed
+            self.RoomWaiters = waiters[n:]
+            for waiter in waiters[:n]:
+                waiter.deliver("set_result", None)
+        if not self.NRunning:
+            self.wakeup(condition="idle")
+            if self.is_empty():
+                self.wakeup(condition="empty")
+
+    def _enqueue(self, task, now=None):
+        # must be called from a synchronized method !
+        now = now or time.time()
+        after = task._Private.After
+        if after is not None and after > now:
+            heapq.heappush(self.Delayed, (after, next(self.Seq), task))
+        else:
+            self._push_ready(task, now)
+        task._Private.Queue = self
+        task._Private.Waiting += 1
+        self.NWaiting += 1
+
+    def _push_ready(self, task, t):
+        # With aging, the effective priority of a task ready since t is priority + aging*(now - t), so the order of
+        # two waiting tasks does not change over time and can be kept in a heap keyed on aging*t - priority.
+        # Among tasks with equal keys, appended tasks start in FIFO order and inserted ones in LIFO order, ahead of appended ones.
+        # Other policies order the tasks with the same priority by the policy key.
+        seq = next(self.Seq)
+        policy = self.Policy
+        if policy is None:
+            order = self.Aging * t - task._Private.Priority
+        else:
+            order = (-task._Private.Priority, policy.key(task, t))
+        entry = (order, -seq if task._Private.Front else seq, task)
+        key = task._Private.Key
+        if key is not None:
+            ks = self._key_state(key)
+            if ks is not None:
+                if ks.NReady + ks.NRunning >= ks.Limit:
+                    heapq.heappush(ks.Backlog, entry)
+                    ks.NBacklog += 1
+                    task._Private.KeyBacklog += 1
+                    return
+                ks.NReady += 1
+                task._Private.KeyReady += 1
+        self._ready_push(entry)
+
+    def _ready_push(self, entry):
+        # must be called from a synchronized method !
+        tenant = entry[2]._Private.Tenant
+        if tenant is None and not self.Tenants:
+            heapq.heappush(self.Ready, entry)
+        else:
+            ts = self._tenant_state(tenant)
+            heapq.heappush(ts.Ready, entry)
+            if not ts.Active:
+                ts.Active = True
+                self.ActiveTenants.append(ts)
+
+    def _tenant_state(self, tenant):
+        # must be called from a synchronized method !
+        ts = self.Tenants.get(tenant)
+        if ts is None:
+            if tenant is not None and None not in self.Tenants:
+                self._tenant_state(None)
+            ts = self.Tenants[tenant] = _TenantState(self.TenantWeights.get(tenant, 1))
+            if tenant is None and self.Ready:
+                # switching to fair share scheduling. The tasks already waiting belong to the default tenant
+                ts.Ready, self.Ready = self.Ready, []
+                ts.Active = True
+                self.ActiveTenants.append(ts)
+        return ts
+
+    def _next_fair(self):
+        # must be called from a synchronized method !
+        # deficit round robin across the tenants with ready tasks
+        active = self.ActiveTenants
+        while active:
+            ts = active[0]
+            ready = ts.Ready
+            while ready and ready[0][2].is_cancelled:
+                heapq.heappop(ready)
+            if not ready:
+                active.popleft()
+                ts.Active = False
+                ts.Deficit = 0.0
+            elif ts.Deficit >= 1.0:
+                ts.Deficit -= 1.0
+                return heapq.heappop(ready)[2]
+            else:
+                ts.Deficit += ts.Weight
+                active.rotate(-1)
+        return None
+
+    def _ready_entries(self):
+        # must be called from a synchronized method !
+        entries = list(self.Ready)
+        for ts in self.Tenants.values():
+            entries += ts.Ready
+        return entries
+
+    @synchronized
+    def set_tenant_weight(self, tenant, weight):
+        """Sets the fair share weight of the tenant. A tenant with weight 2 gets twice as many task starts as a tenant with weight 1,
+        as long as both have tasks waiting.
+
+        Args:
+            tenant (hashable): tenant
+            weight (int or float): weight, greater than 0
+        """
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+        self.TenantWeights[tenant] = weight
+        ts = self.Tenants.get(tenant)
+        if ts is not None:
+            ts.Weight = weight
+
+    @synchronized
+    def tenant_stats(self):
+        """
+        Returns:
+            dict: {tenant: {"weight":, "waiting":, "running":, "started":, "ended":}} for the tenants seen by the queue.
+                "waiting" counts the tasks ready to start, excluding delayed tasks and tasks waiting for a key slot
+        """
+        return {
+            tenant: {
+                "weight":   ts.Weight,
+                "waiting":  sum(1 for _, _, t in ts.Ready if not t.is_cancelled),
+                "running":  ts.NRunning,
+                "started":  ts.NStarted,
+                "ended":    ts.NEnded
+            }
+            for tenant, ts in self.Tenants.items()
+        }
+
+    def _key_state(self, key):
+        # returns _KeyState for the key or None if the key has no limit
+        ks = self.Keys.get(key)
+        if ks is None:
+            limit = self.KeyLimits.get(key, self.KeyLimit)
+            if limit is not None:
+                ks = self.Keys[key] = _KeyState(limit)
+        return ks
+
+    def _key_released(self, key, ks):
+        # admits tasks from the key backlog into the ready heap while the key has free slots
+        backlog = ks.Backlog
+        while backlog and ks.NReady + ks.NRunning < ks.Limit:
+            entry = heapq.heappop(backlog)
+            task = entry[2]
+            if task.is_cancelled:
+                continue
+            task._Private.KeyBacklog -= 1
+            ks.NBacklog -= 1
+            task._Private.KeyReady += 1
+            ks.NReady += 1
+            self._ready_push(entry)
+        if not (ks.NReady or ks.NRunning or backlog):
+            del self.Keys[key]
+
+    @synchronized
+    def set_key_limit(self, key, limit):
+        """Sets or removes the concurrency limit for the key. Removing the limit applies to the tasks added from now on.
+
+        Args:
+            key (hashable): task key
+            limit (int): maximum number of concurrently running tasks with the key. None - no limit
+        """
+        self.KeyLimits[key] = limit
+        ks = self.Keys.get(key)
+        if ks is not None and limit is not None:
+            ks.Limit = limit
+            self._key_released(key, ks)
+            self.start_tasks()
+
+    @synchronized
+    def key_counts(self, key):
+        """
+        Args:
+            key (hashable): task key
+
+        Returns:
+            tuple: (number of waiting tasks holding a slot of the key, number of tasks waiting for a free slot, number of running tasks).
+                All zeros for keys without limit.
+        """
+        ks = self.Keys.get(key)
+        if ks is None:
+            return 0, 0, 0
+        return ks.NReady, ks.NBacklog, ks.NRunning
+
+    def _next_ready(self, now):
+        # must be called from a synchronized method !
+        # moves delayed tasks, which are due, to the ready list and returns the next task to start or None.
+        delayed = self.Delayed
+        while delayed and delayed[0][0] <= now:
+            after, _, task = heapq.heappop(delayed)
+            if not task.is_cancelled:
+                self._push_ready(task, after)
+        if self.Tenants:
+            return self._next_fair()
+        ready = self.Ready
+        while ready:
+            _, _, task = heapq.heappop(ready)
+            if not task.is_cancelled:
+                return task
+        return None
+
+    @synchronized
+    def task_cancelled(self, task):
+        # called by Task.cancel()
+        if self._remove_waiting(task) and self.Stats is not None:
+            self.Stats.count("cancelled")
+
+    def _remove_waiting(self, task):
+        # must be called from a synchronized method !
+        # The task is left in self.Ready or self.Delayed and will be discarded when it comes up. 
+        # Returns True if the task was waiting
+        if task._Private.Queue is self and task._Private.Pending > 0:
+            task._Private.Pending = 0
+            self.NPending -= 1
+            self._dedup_done(task)
+            task._Private.Queue = None
+            self._notify(0)
+            return True
+        elif task._Private.Queue is self and task._Private.Waiting:
+            self.NWaiting -= task._Private.Waiting
+            task._Private.Waiting = 0
+            if not task._Private.Running:
+                self._dedup_done(task)
+            key = task._Private.Key
+            ks = None if key is None else self.Keys.get(key)
+            if ks is not None:
+                ks.NReady -= task._Private.KeyReady
+                ks.NBacklog -= task._Private.KeyBacklog
+                task._Private.KeyReady = task._Private.KeyBacklog = 0
+                self._key_released(key, ks)
+            if not task._Private.Running:
+                task._Private.Queue = None
+            self._notify(1)
+            return True
+        return False
+
+    @synchronized
     def reinsert_task(self, task):
-        self.Queue.insert(task, force=True)
+        task._Private.Front = True
+        self._enqueue(task)
+        self.start_tasks()
 
     def append(self, task, *params, timeout=None, promise_data=None, after=None, force=False, 
-                count=None, interval=None, **args):
-        """Appends the task to the end of the queue. If the queue is at or above its capacity, the method will block.
+                count=None, interval=None, priority=0, key=None, dedup_key=None, retry=None, deadline=None, 
+                run_timeout=None, tenant=None, depends_on=None, 
+                cost=None, **args):
+        """Appends the task to the end of the queue, after waiting tasks with the same or higher priority.
+        If the queue is at or above its capacity, the method will block.
         
         Args:
             task (Task): A Task subclass instance to be added to the queue
@@ -314,6 +1220,29 @@ class TaskQueue(Primitive):
             force (boolean): ignore the queue capacity and append the task immediately. Default: False
             interval (numeric or datetime.timedelta): interval at which to repeat the task. Default: None
             count (int): how many times to repeat the task. Default None.
+            priority (int or float): task priority. Waiting tasks with higher priority start first. Default: 0
+            key (hashable): concurrency limit key, e.g. downstream host name. The number of concurrently running tasks
+                with the same key is limited by the queue's ``key_limit`` or ``key_limits``. Default: None, no per-key limit
+            dedup_key (hashable): if a task with the same ``dedup_key`` is already waiting or running, do not add the new task
+                and return the existing one instead. If the queue keeps a result cache (see ``dedup_cache_size``) and a task
+                with the same ``dedup_key`` has completed recently, return a completed task with the cached result. Default: None
+            retry (RetryPolicy): if the task fails, put it back into the queue to be attempted again after the policy's backoff
+                interval. The task promise fails only when the policy does not allow another attempt. Default: None, do not retry
+            deadline (int or float or datetime): time by which the task must end, interpreted the same way as ``after``.
+                A task still waiting at the deadline is discarded without starting. If the task is running, its token is cancelled
+                and it no longer counts against the queue limits. In both cases, the task promise fails with DeadlineExceeded.
+                Default: None, no deadline
+            run_timeout (int or float or timedelta): maximum run time of the task in seconds. When it expires, the task
+                is treated the same way as a running task at its deadline. Default: None, no limit
+            tenant (hashable): fair share scheduling tag. Once tasks with tenants are added, the queue starts tasks of different
+                tenants in weighted round robin order, so that a tenant with many waiting tasks does not delay the others.
+                Priorities apply among the tasks of the same tenant. Tasks without a tenant share the default tenant None.
+                Default: None
+            depends_on (list): Task objects already added to a queue and/or Promise objects. The task is queued only when
+                all of them complete. If any of them fails, the task fails with DependencyFailed without starting. If any of them
+                is cancelled, the task is cancelled too. Default: None, no dependencies
+            cost (int or float): estimated run time of the task in seconds, used by the "sjf" scheduling policy.
+                Default: None, use the learned mean run time of the task function
         
         Returns:
             Task: the task added to the queue. If the first argument was a callable, then the method will return a Task
@@ -322,16 +1251,37 @@ class TaskQueue(Primitive):
         Raises:
             RuntimeError: the queue is closed or the timeout expired
         """
-        return self.__add("insert", task, *params, 
-                after=after, timeout=timeout, promise_data=promise_data, force=force, count=count, interval=interval, **args)
+        return self.__add("append", task, *params, 
+                after=after, timeout=timeout, promise_data=promise_data, force=force, count=count, interval=interval, 
+                priority=priority, key=key, dedup_key=dedup_key, retry=retry, 
+                deadline=deadline, run_timeout=run_timeout, tenant=tenant, depends_on=depends_on, cost=cost, **args)
         
     add = addTask = append
+
+    def try_append(self, task, *params, **args):
+        """Non-blocking version of append(). If the queue is overloaded (see ``overloaded``), the task is rejected immediately.
+        
+        Args:
+            task (Task): A Task subclass instance to be added to the queue or a callable
+            params, args: same as for append(), except ``timeout`` and ``force``
+        
+        Returns:
+            Task: the task added to the queue or None if the task was rejected
+        """
+        with self:
+            if self.Stop or self.overloaded:
+                return None
+        return self.__add("append", task, *params, force=True, **args)
         
     def __iadd__(self, task):
         return self.addTask(task)
 
-    def insert(self, task, *params, timeout = None, promise_data=None, after=None, force=False, count=None, interval=None, **args):
-        """Inserts the task at the beginning of the queue. If the queue is at or above its capacity, the method will block.
+    def insert(self, task, *params, timeout = None, promise_data=None, after=None, force=False, count=None, interval=None, 
+                priority=0, key=None, dedup_key=None, retry=None, deadline=None, 
+                run_timeout=None, tenant=None, depends_on=None, 
+                cost=None, **args):
+        """Inserts the task at the beginning of the queue, ahead of waiting tasks with the same or lower priority.
+           If the queue is at or above its capacity, the method will block.
            A Task can be also inserted into the queue using the '>>' operator. In this case, '>>' operator returns
            the promise object associated with the task: ``promise = task >> queue``.
         
@@ -347,6 +1297,29 @@ class TaskQueue(Primitive):
             force (boolean): ignore the queue capacity and append the task immediately. Default: False
             interval (numeric or datetime.timedelta): interval at which to repeat the task. Default: None
             count (int): how many times to repeat the task. Default None.
+            priority (int or float): task priority. Waiting tasks with higher priority start first. Default: 0
+            key (hashable): concurrency limit key, e.g. downstream host name. The number of concurrently running tasks
+                with the same key is limited by the queue's ``key_limit`` or ``key_limits``. Default: None, no per-key limit
+            dedup_key (hashable): if a task with the same ``dedup_key`` is already waiting or running, do not add the new task
+                and return the existing one instead. If the queue keeps a result cache (see ``dedup_cache_size``) and a task
+                with the same ``dedup_key`` has completed recently, return a completed task with the cached result. Default: None
+            retry (RetryPolicy): if the task fails, put it back into the queue to be attempted again after the policy's backoff
+                interval. The task promise fails only when the policy does not allow another attempt. Default: None, do not retry
+            deadline (int or float or datetime): time by which the task must end, interpreted the same way as ``after``.
+                A task still waiting at the deadline is discarded without starting. If the task is running, its token is cancelled
+                and it no longer counts against the queue limits. In both cases, the task promise fails with DeadlineExceeded.
+                Default: None, no deadline
+            run_timeout (int or float or timedelta): maximum run time of the task in seconds. When it expires, the task
+                is treated the same way as a running task at its deadline. Default: None, no limit
+            tenant (hashable): fair share scheduling tag. Once tasks with tenants are added, the queue starts tasks of different
+                tenants in weighted round robin order, so that a tenant with many waiting tasks does not delay the others.
+                Priorities apply among the tasks of the same tenant. Tasks without a tenant share the default tenant None.
+                Default: None
+            depends_on (list): Task objects already added to a queue and/or Promise objects. The task is queued only when
+                all of them complete. If any of them fails, the task fails with DependencyFailed without starting. If any of them
+                is cancelled, the task is cancelled too. Default: None, no dependencies
+            cost (int or float): estimated run time of the task in seconds, used by the "sjf" scheduling policy.
+                Default: None, use the learned mean run time of the task function
         
         Returns:
             Task: the task added to the queue. If the first argument was a callable, then the method will return a Task
@@ -356,10 +1329,69 @@ class TaskQueue(Primitive):
             RuntimeError: the queue is closed or the timeout expired
         """
         return self.__add("insert", task, *params, 
-                after=after, timeout=timeout, promise_data=promise_data, force=force, count=count, interval=interval, **args)
+                after=after, timeout=timeout, promise_data=promise_data, force=force, count=count, interval=interval, 
+                priority=priority, key=key, dedup_key=dedup_key, retry=retry, 
+                deadline=deadline, run_timeout=run_timeout, tenant=tenant, depends_on=depends_on, cost=cost, **args)
         
     insertTask = insert
 
+    def submit_async(self, task, *params, timeout=None, force=False, **args):
+        """Adds the task to the queue from a coroutine and returns an asyncio Future for the task result.
+        Must be called from a coroutine running in an event loop. The task may be a Task, a callable or a coroutine function.
+        Accepts the same keyword arguments as append(). The method never blocks the event loop. If the queue is at its
+        capacity, the task is added by a coroutine, which waits for room in the queue without blocking.
+
+            result = await queue.submit_async(fetch, url)
+
+        Args:
+            timeout (int or float): time to wait for room in the queue. If it expires, the future fails with RuntimeError.
+                Default: wait indefinitely
+            force (boolean): ignore the queue capacity and append the task immediately. Default: False
+
+        Returns:
+            asyncio.Future: future, which will be resolved when the task ends. Cancelling the future before the task
+                is added to the queue stops waiting for room.
+        """
+        loop = asyncio.get_running_loop()
+        with self:
+            room = force or not self._full()
+        if room:
+            return self.append(task, *params, force=True, **args).promise.asyncio_future(loop)
+        future = loop.create_future()
+        loop.create_task(self._submit_when_room(loop, future, task, params, args, timeout))
+        return future
+
+    async def _submit_when_room(self, loop, future, task, params, args, timeout):
+        t1 = None if timeout is None else time.time() + timeout
+        try:
+            while True:
+                if future.done():
+                    return              # cancelled by the caller
+                with self:
+                    if self.Stop:
+                        raise RuntimeError("Queue is closed")
+                    if not self._full():
+                        break
+                    waiter = loop.create_future()
+                    callback = _FutureCallback(loop, waiter)
+                    self.RoomWaiters.append(callback)
+                    # make sure the queue is moving before waiting
+                    self.start_tasks()
+                dt = None if t1 is None else t1 - time.time()
+                if dt is not None and dt <= 0:
+                    raise RuntimeError("Operation timed-out")
+                # the wait is also bounded, in case the wakeup went to a waiter, which has stopped waiting
+                await asyncio.wait([waiter], timeout=1.0 if dt is None else min(dt, 1.0))
+                with self:
+                    if callback in self.RoomWaiters:
+                        self.RoomWaiters.remove(callback)
+            added = self.append(task, *params, force=True, **args)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        added.promise.addCallback(_FutureCallback(loop, future))
+
     def __lshift__(self, task):
         """Allows to append the task using the '<<' operator: ``promise = queue << task``.
         
@@ -368,79 +1400,363 @@ class TaskQueue(Primitive):
         """
         return self.append(task)
 
+    @synchronized
+    def set_start_timer(self, t):
+        # schedules a deferred start_tasks() call at time t or cancels it if t is None.
+        # Re-arming for the same time is a no-op, so the timer is not churned by every start_tasks() call
+        if t == self.StartTime:
+            return
+        service = timer_service()
+        if self.StartTimer is not None:
+            service.cancel(self.StartTimer)
+            self.StartTimer = None
+        self.StartTime = t
+        if t is not None:
+            self.StartTimer = service.schedule(t, self._start_timer_fired, t)
+
+    def _start_timer_fired(self, t):
+        with self:
+            if self.StartTime == t:
+                self.StartTimer = self.StartTime = None
+        self.start_tasks()
+
     @synchronized
     def start_tasks(self):
-        self.cancel_alarm()
-        # remove cancelled tasks
-        for t in self.Queue.items():
-            if t.is_cancelled:
-                self.Queue.remove(t)
-        again = True
-        while not (self.Stop or self.Held) and again:
-            again = False
+        wake_up_at = None
+        limit = self.limit
+        while not (self.Stop or self.Held) and self.NWaiting:
+            if limit is not None and self.NRunning >= limit:
+                break
             now = time.time()
-            if self.Stagger is not None and self.LastStart + self.Stagger > now:
-                self.alarm(self.start_tasks, t = self.LastStart + self.Stagger)
-            elif self.Queue:
-                nrunning = self.nrunning()
-                if (self.NWorkers is None or nrunning < self.NWorkers):
-                    next_task = None
-                    sleep_until = None
-                    waiting_tasks = self.waitingTasks()
-                    for t in self.waitingTasks():
-                        after = t._Private.After
-                        if after is None or after <= now:
-                            next_task = t
-                            break
-                        else:
-                            sleep_until = after if sleep_until is None else min(sleep_until, after)
-                    if next_task is not None:
-                        t = self.ExecutorThread(self, next_task)
-                        t.kind = "%s.task" % (self.kind,)
-                        self.LastStart = time.time()
-                        self.call_delegate("taskIsStarting", self, next_task, t)
-                        t.start()
-                        self.call_delegate("taskStarted", self, next_task, t)
-                        again = True
-                    elif sleep_until is not None:
-                        self.alarm(self.start_tasks, t=sleep_until)
-
-    def threadEnded(self, task, repeat):
-        if not repeat:
-            try:    self.Queue.remove(task)
-            except ValueError:  pass
-            self.wakeup()               # in case someone is waiting for the queue to be drained
+            if self.Stagger and self.LastStart + self.Stagger > now:
+                wake_up_at = self.LastStart + self.Stagger
+                break
+            if self.RateLimiters:
+                delay = max(limiter.delay(now) for limiter in self.RateLimiters)
+                if delay > 0:
+                    wake_up_at = now + delay
+                    break
+            next_task = self._next_ready(now)
+            if next_task is None:
+                if self.Delayed:
+                    wake_up_at = self.Delayed[0][0]
+                break
+            deadline = next_task._Private.Deadline
+            if deadline is not None:
+                if deadline <= now:
+                    # the expiry timer has not fired yet. Do not start the task, the timer will fail its promise
+                    next_task._Private.Expired = next_task._Private.Cancelled = True
+                    self._remove_waiting(next_task)
+                    self._dedup_done(next_task)
+                    if self.Stats is not None:
+                        self.Stats.count("expired")
+                    continue
+            if self.MaxQueueWait is not None or self.CoDel is not None:
+                waited = self.QueueWait = now - max(next_task.Queued or now, next_task._Private.After or 0)
+                if self.MaxQueueWait is not None and waited > self.MaxQueueWait \
+                            or self.CoDel is not None and self.CoDel.should_drop(waited, now):
+                    self._reject_task(next_task, waited)
+                    continue
+            if next_task._Private.RunTimeout is not None:
+                expires = now + next_task._Private.RunTimeout
+                if deadline is None or expires < deadline:
+                    self._arm_expiry(next_task, expires)
+            for limiter in self.RateLimiters:
+                limiter.consume(now)
+            next_task._Private.Waiting -= 1
+            self.NWaiting -= 1
+            key = next_task._Private.Key
+            if key is not None:
+                ks = self.Keys.get(key)
+                if ks is not None:
+                    if next_task._Private.KeyReady:
+                        next_task._Private.KeyReady -= 1
+                        ks.NReady -= 1
+                    ks.NRunning += 1
+            self.NRunning += 1
+            self.Running.add(next_task)
+            if self.Stats is not None:
+                self.Stats.task_started(now - max(next_task.Queued or now, next_task._Private.After or 0))
+            if self.Tenants:
+                ts = self._tenant_state(next_task._Private.Tenant)
+                ts.NRunning += 1
+                ts.NStarted += 1
+            if asyncio.iscoroutinefunction(next_task.run):
+                next_task._Private.Running = True
+                loop = self.Loop or default_event_loop()
+                self.LastStart = time.time()
+                self.call_delegate("taskIsStarting", self, next_task, loop)
+                asyncio.run_coroutine_threadsafe(self.run_coroutine_task(next_task), loop)
+                t = loop
+            elif self.Pool:
+                t = self.IdleWorkers.pop() if self.IdleWorkers else self.new_worker()
+                self.LastStart = time.time()
+                self.call_delegate("taskIsStarting", self, next_task, t)
+                t.assign(next_task)
+            else:
+                t = self.ExecutorThread(self, next_task)
+                t.kind = "%s.task" % (self.kind,)
+                self.LastStart = time.time()
+                self.call_delegate("taskIsStarting", self, next_task, t)
+                t.start()
+            self.call_delegate("taskStarted", self, next_task, t)
+        self.set_start_timer(wake_up_at)
+
+    def _reject_task(self, task, waited):
+        # must be called from a synchronized method !
+        # the task is not locked here to keep the queue -> task lock order out of the picture
+        task._Private.Cancelled = True
+        token = task._Private.Token
+        self._remove_waiting(task)
+        if self.Stats is not None:
+            self.Stats.count("rejected")
+        self._dedup_done(task)
+        self._disarm_expiry(task)
+        exc = TaskRejected("task rejected after waiting in the queue for %.3f seconds" % (waited,))
+        if token is not None:
+            token.cancel(exc)
+        promise = task.promise
+        if promise is not None:
+            promise.exception(TaskRejected, exc, None)
+        self.call_delegate("taskRejected", self, task, waited)
+
+    @property
+    def overloaded(self):
+        """
+        Returns:
+            boolean: whether the queue is full, is dropping tasks or the queue wait time of the last started task exceeded
+                ``max_queue_wait``
+        """
+        if self.Capacity is not None and self.NWaiting + self.NRunning >= self.Capacity:
+            return True
+        if not self.NWaiting:
+            return False
+        return self.CoDel is not None and self.CoDel.overloaded \
+            or self.MaxQueueWait is not None and self.QueueWait > self.MaxQueueWait
+
+    def run_task(self, task, worker=None):
+        # runs the task in the calling thread, which is either an ExecutorThread or a pool WorkerThread
+        task._started()             # this will decrement RunCount
+        repeat = False
+        try:
+            result = self.Executor.call(task)
+            repeat = self.finish_task(task, result)
+        except:
+            repeat = self.fail_task(task, *sys.exc_info())
+        finally:
+            self.threadEnded(task, repeat, worker)
+
+    async def run_coroutine_task(self, task):
+        # runs the task with a coroutine run() method on the event loop
+        task._started()
+        repeat = False
+        try:
+            result = await task.run()
+            repeat = self.finish_task(task, result)
+        except:
+            repeat = self.fail_task(task, *sys.exc_info())
+        finally:
+            self.threadEnded(task, repeat)
+
+    def finish_task(self, task, result):
+        # called when the task run ended successfully. Returns True if the task is to be repeated
+        task._ended()
+        if self.Policy is not None:
+            self.Policy.task_ran(task)
+        if task._Private.Expired:
+            return False
+        #print(task._Private.__dict__)
+        repeat = task.to_be_repeated() \
+            and self.taskWillRepeat(task, result, task._Private.After, task._Private.RunCount) is not False
+        #print("repeat:", repeat)
+        if repeat:
+            task._Private.Attempts = 0
+            interval = task._Private.RepeatInterval or 0
+            task._Private.After = (task._Private.LastStart if task._Private.After is None else task._Private.After) + interval
+        else:
+            if self.DedupCacheSize and task._Private.DedupKey is not None:
+                self._cache_result(task._Private.DedupKey, result)
+            task.deliver_promise(result)
+            self.taskEnded(task, result)
+        return repeat
+
+    def fail_task(self, task, exc_type, value, tb):
+        # called when the task run raised an exception. Returns True if the task is to be attempted again
+        task._ended()
+        if task._Private.Expired:
+            return False
+        retry = task._Private.Retry
+        if retry is not None and not task.is_cancelled and not self.Stop \
+                    and retry.should_retry(task._Private.Attempts, exc_type, value):
+            delay = retry.delay(task._Private.Attempts)
+            if self.taskWillRetry(task, exc_type, value, tb, delay) is not False:
+                with task:
+                    if task._Private.RunCount is not None:
+                        task._Private.RunCount += 1         # the failed attempt does not count as a run
+                    task._Private.After = time.time() + delay
+                return True
+        traceback.print_exception(exc_type, value, tb)
+        promise = task.promise
+        if promise is not None:
+            promise.exception(exc_type, value, tb)
+        self.taskFailed(task, exc_type, value, tb)
+        return False
+
+    @synchronized
+    def new_worker(self):
+        worker = self.WorkerThread(self, self.IdleTimeout)
+        worker.kind = "%s.worker" % (self.kind,)
+        self.NWorkerThreads += 1
+        worker.start()
+        return worker
+
+    @synchronized
+    def retire_worker(self, worker):
+        # called by an idle worker thread when it times out or is stopped. Returns True if the worker should exit
+        if worker.Task is not None:
+            return False            # a task was assigned just before the time-out
+        try:    self.IdleWorkers.remove(worker)
+        except ValueError:  pass
+        self.NWorkerThreads -= 1
+        return True
+
+    @synchronized
+    def threadEnded(self, task, repeat, worker=None):
+        # reset the Running flag while the queue is locked so that the task is not seen as waiting before it is removed
+        task._Private.Running = False
+        released = self._release_slot(task)
+        if self.Stats is not None:
+            run_time = task.run_time
+            if run_time is not None:
+                self.Stats.task_ran(run_time)
+        if task._Private.RunTimeout is not None and task._Private.Expiry is not None:
+            # replace the run time-out with the deadline, if any
+            if repeat and not task.is_cancelled and task._Private.Deadline is not None:
+                self._arm_expiry(task, task._Private.Deadline)
+            else:
+                self._disarm_expiry(task)
+        elif not repeat:
+            self._disarm_expiry(task)
+        if worker is not None:
+            # called by the worker thread itself
+            worker.Task = None
+            if self.Stop:
+                worker.stop()
+            else:
+                self.IdleWorkers.append(worker)
+        if repeat and not task.is_cancelled:
+            task._Private.Front = False
+            self._enqueue(task)
+        else:
+            self._dedup_done(task)
+            if not task._Private.Waiting:
+                task._Private.Queue = None
+        # in case someone is waiting for the queue to be drained or for room in the queue
+        self._notify(1 if released and not (repeat and not task.is_cancelled) else 0)
         self.start_tasks()
+
+    def nworker_threads(self):
+        """
+        Returns:
+            int: in pool mode, number of worker threads currently alive, busy or idle. In per-task thread mode, always 0
+        """
+        return self.NWorkerThreads
         
     def call_delegate(self, cb, *params):
         if self.Delegate is not None and hasattr(self.Delegate, cb):
+            t0 = time.perf_counter()
             try:    
                 return getattr(self.Delegate, cb)(*params)
             except:
                 traceback.print_exc(file=sys.stderr)
+            finally:
+                if self.Stats is not None:
+                    self.Stats.delegate_called(time.perf_counter() - t0)
             
+    @property
+    def limit(self):
+        """
+        Returns:
+            int: current maximum number of concurrently running tasks or None if unlimited
+        """
+        if self.Concurrency is None:
+            return self.NWorkers
+        limit = self.Concurrency.limit
+        return limit if self.NWorkers is None else min(limit, self.NWorkers)
+
     def taskEnded(self, task, result):
+        if self.Stats is not None:
+            self.Stats.count("completed")
+        if self.Concurrency is not None:
+            self.Concurrency.taskEnded(self, task, result)
         return self.call_delegate("taskEnded", self, task, result)
         
     def taskWillRepeat(self, task, result, next_t, count):
         return self.call_delegate("taskWillRepeat", self, task, result, next_t, count)
         
+    def taskWillRetry(self, task, exc_type, exc_value, tb, delay):
+        if self.Concurrency is not None:
+            self.Concurrency.taskFailed(self, task, exc_type, exc_value, tb)
+        retry = self.call_delegate("taskWillRetry", self, task, exc_type, exc_value, tb, delay)
+        if retry is not False and self.Stats is not None:
+            self.Stats.count("retried")
+        return retry
+
     def taskFailed(self, task, exc_type, exc_value, tb):
+        if self.Stats is not None:
+            self.Stats.count("failed")
+        if self.Concurrency is not None:
+            self.Concurrency.taskFailed(self, task, exc_type, exc_value, tb)
         return self.call_delegate("taskFailed", self, task,  exc_type, exc_value, tb)
             
+    def stats(self):
+        """
+        Returns:
+            dict: snapshot of the queue statistics: task counters "started", "completed", "failed", "cancelled", "rejected",
+                "expired", "retried", current numbers of "waiting", "running" and "pending" (waiting for dependencies) tasks, and
+                "queue_wait", "run_time" and "delegate_time" histogram snapshots with count, sum, mean, min, max
+                and percentiles in seconds. None if the queue was created with ``stats=False``
+        """
+        if self.Stats is None:
+            return None
+        snapshot = self.Stats.snapshot()
+        with self:
+            snapshot["waiting"] = self.NWaiting
+            snapshot["running"] = self.NRunning
+            snapshot["pending"] = self.NPending
+        return snapshot
+
+    def export_stats(self, dest, prefix="pythreader_task_queue", labels=None):
+        """Writes the queue statistics in Prometheus text exposition format
+
+        Args:
+            dest: file path, file-like object or callable, which will be called with the text as the argument
+            prefix (str): metric name prefix. Default: "pythreader_task_queue"
+            labels (dict): labels to add to the metrics. Default: {"queue": name} if the queue has a name
+        """
+        if self.Stats is None:
+            raise RuntimeError("The queue does not collect statistics")
+        if labels is None:
+            labels = {"queue": self.Name} if self.Name else {}
+        write_text(prometheus_text(self.stats(), prefix, labels), dest)
+
+    @synchronized
     def waitingTasks(self):
         """
         Returns:
             list: the list of tasks waiting in the queue
         """
-        return [t for t in self.Queue.items() if not t.is_running]
+        return [t for _, _, t in sorted(self._ready_entries()) if not t.is_cancelled] \
+            + [t for ks in self.Keys.values() for _, _, t in sorted(ks.Backlog) if not t.is_cancelled] \
+            + [t for _, _, t in sorted(self.Delayed) if not t.is_cancelled]
         
+    @synchronized
     def activeTasks(self):
         """
         Returns:
             list: the list of running tasks
         """
-        return [t for t in self.Queue.items() if t.is_running]
+        return list(self.Running)
         
     @synchronized
     def tasks(self):
@@ -448,24 +1764,21 @@ class TaskQueue(Primitive):
         Returns:
             tuple: (self.waitingTasks(), self.activeTasks())
         """
-        tasks = self.Queue.items()
-        return [t for t in tasks if not t.is_running], [t for t in tasks if t.is_running]
+        return self.waitingTasks(), self.activeTasks()
         
-    @synchronized
     def nrunning(self):
         """
         Returns:
             int: number of runnign tasks
         """
-        return sum(t.is_running for t in self.Queue.items())
+        return self.NRunning
         
-    @synchronized
     def nwaiting(self):
         """
         Returns:
             int: number of waiting tasks
         """
-        return sum(not t.is_running for t in self.Queue.items())
+        return self.NWaiting
         
     @synchronized
     def counts(self):
@@ -473,11 +1786,7 @@ class TaskQueue(Primitive):
         Returns:
             tuple: (self.nwaiting(), self.nrunning())
         """
-        nrunning, nwaiting = 0, 0
-        for t in self.Queue.items():
-            if t.is_running:    nrunning += 1
-            else:               nwaiting += 1
-        return nwaiting, nrunning
+        return self.NWaiting, self.NRunning
     
     def hold(self):
         """
@@ -496,9 +1805,9 @@ class TaskQueue(Primitive):
     def is_empty(self):
         """
         Returns:
-            bollean: True if no tasks are running and no tasks are waiting
+            bollean: True if no tasks are running and no tasks are waiting, including tasks waiting for their dependencies
         """
-        return len(self.Queue) == 0
+        return self.NWaiting + self.NRunning + self.NPending == 0
         
     isEmpty = is_empty
     
@@ -508,9 +1817,8 @@ class TaskQueue(Primitive):
         Blocks until the queue is empty (no tasks are running or waiting)
         """
         # wait until all tasks are done and the queue is empty
-        if not self.is_empty():
-            while not self.sleep(function=self.is_empty):
-                pass
+        while not self.is_empty():
+            self.sleep(condition="empty")
                 
     join = waitUntilEmpty
 
@@ -518,17 +1826,47 @@ class TaskQueue(Primitive):
         """
         Blocks until no more tasks are running
         """
-        while self.nrunning() > 0:
-            self.sleep(10)
+        with self:
+            while self.NRunning > 0:
+                self.sleep(10, condition="idle")
 
     @synchronized
     def flush(self):
         """
-        Discards all tasks. Running tasks will not be interrupted.
+        Discards all waiting tasks. Running tasks will not be interrupted.
         """
-        self.Queue.flush()
+        ready = self._ready_entries()
+        for _, _, task in ready + self.Delayed:
+            task._Private.Waiting = 0
+            if not task._Private.Running:
+                task._Private.Queue = None
+                self._disarm_expiry(task)
+        for key, ks in list(self.Keys.items()):
+            for _, _, task in ks.Backlog:
+                task._Private.Waiting = task._Private.KeyBacklog = 0
+                if not task._Private.Running:
+                    task._Private.Queue = None
+                    self._disarm_expiry(task)
+            ks.Backlog = []
+            ks.NReady = ks.NBacklog = 0
+            if not ks.NRunning:
+                del self.Keys[key]
+        for _, _, task in ready:
+            task._Private.KeyReady = 0
+        self.Ready = []
+        for ts in self.Tenants.values():
+            ts.Ready = []
+            ts.Active = False
+            ts.Deficit = 0.0
+        self.ActiveTenants.clear()
+        self.Delayed = []
+        self.NWaiting = 0
+        for task in list(self.InFlight.values()):
+            if not task._Private.Running:
+                self._dedup_done(task)
+        self.set_start_timer(None)
+        self._notify()
 
-    @synchronized
     def cancel(self, task):
         """
         Cancel a queued task and remove it from the queue. The Promise associated with the Task will be cancelled.
@@ -543,10 +1881,9 @@ class TaskQueue(Primitive):
             Task: cancelled task
         """
 
-        task.cancel()
-        try:    self.Queue.remove(task)
-        except ValueError:
+        if task._Private.Queue is not self:
             raise ValueError("Task not in the queue")
+        task.cancel()
         self.call_delegate("taskCancelled", self, task)
         self.start_tasks()
         return task
@@ -555,13 +1892,28 @@ class TaskQueue(Primitive):
         """
         Returns total number of tasks in the queue, running and pending.
         """
-        return len(self.Queue)
+        return self.NWaiting + self.NRunning
 
     def __contains__(self, task):
         """
         Returns true if the task is in the queue, running or waiting.
         """
-        return task in self.Queue
+        return task._Private.Queue is self
+
+
+class ProcessTaskQueue(TaskQueue):
+    
+    def __init__(self, nworkers=None, pool=True, mp_context=None, **args):
+        """TaskQueue, which runs the tasks in a pool of worker processes. The tasks must be picklable.
+        Accepts the same arguments as the TaskQueue, except ``executor``. 
+        
+        Args:
+            nworkers (int): maximum number of tasks to be executed concurrently and the number of worker processes. Default: number of CPUs
+            pool (boolean): use long-lived threads to wait for the worker processes. Default: True
+            mp_context: multiprocessing context to create the worker processes. Default: multiprocessing default context
+        """
+        nworkers = nworkers or os.cpu_count()
+        TaskQueue.__init__(self, nworkers, pool=pool, executor=ProcessExecutor(nworkers, mp_context), **args)
 
 
 class _Delegate(object):
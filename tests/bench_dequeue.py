@@ -0,0 +1,46 @@
+#
+# Throughput of a DEQueue with many blocked consumers. Each appended item wakes up one consumer waiting on the "not_empty"
+# condition. The "broadcast" variant wakes up all the consumers for each item, the way it was done before, so that all but one
+# of them go back to sleep.
+#
+
+import time, sys
+from threading import Thread
+from pythreader import DEQueue, synchronized
+
+class BroadcastDEQueue(DEQueue):
+
+    @synchronized
+    def append(self, item, timeout=None, force=False):
+        DEQueue.append(self, item, timeout=timeout, force=force)
+        self.wakeup(condition="not_empty")
+
+def consumer(queue, counts, i):
+    n = 0
+    while queue.pop() is not None:
+        n += 1
+    counts[i] = n
+
+def measure(cls, nconsumers, nitems):
+    queue = cls(capacity=100)
+    counts = [0] * nconsumers
+    threads = [Thread(target=consumer, args=(queue, counts, i), daemon=True) for i in range(nconsumers)]
+    for t in threads:
+        t.start()
+    time.sleep(0.5)         # let the consumers block
+    t0 = time.perf_counter()
+    for i in range(nitems):
+        queue.append(i)
+    queue.close()
+    for t in threads:
+        t.join()
+    dt = time.perf_counter() - t0
+    assert sum(counts) == nitems
+    return nitems / dt
+
+nitems = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+print("%-12s %10s %16s" % ("consumers", "items/s", "broadcast items/s"))
+for nconsumers in (1, 8, 64):
+    rate = measure(DEQueue, nconsumers, nitems)
+    rate_broadcast = measure(BroadcastDEQueue, nconsumers, nitems)
+    print("%-12d %10.0f %16.0f   %.1fx" % (nconsumers, rate, rate_broadcast, rate / rate_broadcast))
@@ -0,0 +1,35 @@
+#
+# Compares thread, process and subinterpreter TaskQueue executors
+#   - "cpu": CPU-bound tasks, which serialize on the GIL when run in threads
+#   - "short": trivial tasks, which show the per-task overhead of each backend
+#
+import time, os, sys
+from pythreader import TaskQueue, InterpreterExecutor
+from pythreader.task_queue import FunctionTask
+
+def burn(n):
+    x = 0
+    for i in range(n):
+        x += i*i
+    return x
+
+def noop(x):
+    return x
+
+def run(executor, nworkers, fcn, arg, ntasks):
+    q = TaskQueue(nworkers, pool=True, executor=executor)
+    t0 = time.time()
+    q.extend(FunctionTask(fcn, arg) for _ in range(ntasks)).wait()
+    dt = time.time() - t0
+    q.stop()
+    return dt
+
+if __name__ == "__main__":
+    nworkers = os.cpu_count()
+    backend = InterpreterExecutor().Backend
+    print("Python %s, %d CPUs, interpreter executor backend: %s" % (sys.version.split()[0], nworkers, backend))
+    print("%-12s %12s %12s" % ("executor", "cpu, sec", "short, sec"))
+    for executor in ("thread", "process", "interpreter"):
+        t_cpu = run(executor, nworkers, burn, 1000000, nworkers*4)
+        t_short = run(executor, nworkers, noop, 1, 1000)
+        print("%-12s %12.3f %12.3f" % (executor, t_cpu, t_short))
@@ -0,0 +1,45 @@
+#
+# Per-object construction time and memory of the Primitive based objects. The Condition and the gate Semaphore of a Primitive
+# are created on first use. The "eager" variants force them to be created in the constructor, the way it was done before.
+#
+
+import time, tracemalloc
+from pythreader import Primitive, Promise, Task
+
+class EagerPrimitive(Primitive):
+    def __init__(self):
+        Primitive.__init__(self)
+        self._WakeUp, self._Gate            # force creation
+
+class EagerPromise(Promise):
+    def __init__(self):
+        Promise.__init__(self)
+        self._WakeUp, self._Gate
+
+class NoopTask(Task):
+    def run(self):
+        pass
+
+class EagerTask(NoopTask):
+    def __init__(self):
+        NoopTask.__init__(self)
+        self._WakeUp, self._Gate
+
+def measure(cls, n=50000):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        cls()
+    t = (time.perf_counter() - t0) / n
+    tracemalloc.start()
+    objects = [cls() for _ in range(n)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return t, size / n
+
+print("%-16s %12s %12s" % ("class", "create, us", "bytes"))
+for lazy, eager in [(Primitive, EagerPrimitive), (Promise, EagerPromise), (NoopTask, EagerTask)]:
+    t_lazy, m_lazy = measure(lazy)
+    t_eager, m_eager = measure(eager)
+    print("%-16s %12.2f %12d" % (eager.__name__, t_eager * 1e6, m_eager))
+    print("%-16s %12.2f %12d   %.1fx faster, %d%% less memory" % (lazy.__name__, t_lazy * 1e6, m_lazy, 
+            t_eager / t_lazy, 100 * (1 - m_lazy / m_eager)))
@@ -0,0 +1,75 @@
+#
+# Call overhead of synchronized methods. "old" is the previous implementation of the decorator, which went through
+# Primitive.__enter__/__exit__, "direct" is a method locking the primitive's lock explicitly, "profiled" is a primitive
+# with the lock contention profiler enabled.
+#
+
+import time
+from threading import get_ident
+from pythreader import Primitive, DEQueue, synchronized
+
+def old_synchronized(method):
+    def smethod(self, *params, **args):
+        me = get_ident()
+        with self:
+            out = method(self, *params, **args)
+        return out
+    smethod.__doc__ = method.__doc__
+    return smethod
+
+class Counter(Primitive):
+
+    def __init__(self, reentrant=True, profile=None):
+        Primitive.__init__(self, reentrant=reentrant, profile=profile)
+        self.N = 0
+
+    def plain(self):
+        self.N += 1
+
+    def direct(self):
+        with self._Lock:
+            self.N += 1
+
+    @old_synchronized
+    def old(self):
+        self.N += 1
+
+    @synchronized
+    def new(self):
+        self.N += 1
+
+def measure(f, n):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        f()
+    return (time.perf_counter() - t0) / n * 1e9
+
+n = 500000
+rlocked = Counter()
+locked = Counter(reentrant=False)
+profiled = Counter(profile=True)
+base = measure(rlocked.plain, n)
+print("%-30s %8s %10s" % ("method", "ns/call", "overhead"))
+for label, f in [
+        ("unlocked", rlocked.plain),
+        ("old synchronized, RLock", rlocked.old),
+        ("direct, RLock", rlocked.direct),
+        ("synchronized, RLock", rlocked.new),
+        ("direct, Lock", locked.direct),
+        ("synchronized, Lock", locked.new),
+        ("synchronized, RLock, profiled", profiled.new)
+    ]:
+    t = measure(f, n)
+    print("%-30s %8.0f %10.0f" % (label, t, t - base))
+
+assert Counter.new.__name__ == "new" and Counter.new.__wrapped__ is not None
+
+print()
+n = 200000
+for reentrant in (True, False):
+    queue = DEQueue(reentrant=reentrant)
+    t0 = time.perf_counter()
+    for i in range(n):
+        queue.append(i)
+        queue.pop()
+    print("DEQueue append+pop, %-8s %8.0f ns" % ("RLock" if reentrant else "Lock", (time.perf_counter() - t0) / n * 1e9))
@@ -0,0 +1,63 @@
+#
+# TimerService timing wheel: cost of scheduling and cancelling with 1M armed calls, firing accuracy, and many periodic
+# Timers sharing the TimerService threads.
+#
+
+import time, random, threading, tracemalloc, sys
+from pythreader import TimerService, Timer
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+def noop():
+    pass
+
+service = TimerService(name="bench")
+delays = [60 + random.random() * 3600 for _ in range(N)]
+
+t0 = time.perf_counter()
+entries = [service.schedule(d, noop) for d in delays]
+dt = time.perf_counter() - t0
+print("schedule: %d calls armed, %.2f us/call" % (service.pending(), dt / N * 1e6))
+
+t0 = time.perf_counter()
+for e in entries:
+    service.cancel(e)
+dt = time.perf_counter() - t0
+print("cancel:   %.2f us/call, %d pending" % (dt / N * 1e6, service.pending()))
+assert service.pending() == 0
+del entries
+
+tracemalloc.start()
+entries = [service.schedule(d, noop) for d in delays[:100000]]
+size, _ = tracemalloc.get_traced_memory()
+tracemalloc.stop()
+print("memory:   %d bytes/call" % (size / len(entries),))
+for e in entries:
+    service.cancel(e)
+del entries
+
+n = 20000
+lateness = []
+done = threading.Event()
+def fire(t):
+    lateness.append(time.time() - t)
+    if len(lateness) == n:
+        done.set()
+for _ in range(n):
+    d = random.random() * 2
+    service.schedule(d, fire, time.time() + d)
+assert done.wait(10)
+lateness.sort()
+print("fired:    %d calls, lateness p50 %.2f ms, p99 %.2f ms, max %.2f ms" % (n, lateness[n//2] * 1000, lateness[int(n * 0.99)] * 1000,
+            lateness[-1] * 1000))
+
+threads = threading.active_count()
+counts = [0] * 10000
+def tick(i):
+    counts[i] += 1
+timers = [Timer(tick, i, interval=0.1, service=service) for i in range(len(counts))]
+time.sleep(1.05)
+for t in timers:
+    t.cancel()
+print("timers:   %d periodic timers, %.1f fires each in 1 s, %d threads before, %d threads after" % (len(timers), sum(counts) / len(counts),
+            threads, threading.active_count()))
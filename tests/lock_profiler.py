@@ -0,0 +1,70 @@
+import time
+from threading import Thread
+from pythreader import Primitive, DEQueue, TaskQueue, synchronized, lock_profiler
+
+class Resource(Primitive):
+
+    @synchronized
+    def use(self, dt):
+        time.sleep(dt)
+
+    @synchronized
+    def nested(self):
+        self.use(0)
+
+unprofiled = Resource(name="unprofiled")
+assert type(unprofiled._Lock).__name__ != "ProfiledLock"
+
+lock_profiler.enable()
+hot = Resource(name="hot")
+cold = Resource(name="cold")
+queue = DEQueue()
+lock_profiler.disable()
+
+def worker():
+    for _ in range(10):
+        hot.use(0.005)
+    cold.use(0.001)
+
+threads = [Thread(target=worker) for _ in range(4)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+hot.nested()
+
+# conditions work with the profiled lock
+consumer = Thread(target=lambda: queue.pop())
+consumer.start()
+time.sleep(0.1)
+queue.append(1)
+consumer.join()
+
+print(lock_profiler.format_report())
+report = {p["name"]: p for p in lock_profiler.report()}
+assert "unprofiled" not in report
+assert lock_profiler.report()[0]["name"] == "hot"
+h = report["hot"]
+assert h["acquisitions"] == 41, h["acquisitions"]            # nested acquisitions are counted once
+assert h["contended"] > 0 and h["max_waiters"] >= 1 and h["waiters"] == 0
+assert h["wait_time"]["sum"] > 0.05
+assert 0.004 < h["hold_time"]["p50"] < 0.01
+assert report["cold"]["acquisitions"] == 4
+assert report["DEQueue"]["acquisitions"] >= 3 and report["DEQueue"]["hold_time"]["max"] < 0.05
+
+forced = Resource(name="forced", profile=True)
+forced.use(0)
+assert lock_profiler.report(sort="acquisitions")[-1]["name"] == "forced"
+
+lock_profiler.reset()
+assert all(p["acquisitions"] == 0 for p in lock_profiler.report())
+
+lock_profiler.enable()
+q = TaskQueue(2, name="profiled queue")
+lock_profiler.disable()
+for _ in range(10):
+    q.append(time.sleep, 0.01)
+q.join()
+report = {p["name"]: p for p in lock_profiler.report()}
+assert report["profiled queue"]["acquisitions"] > 10
+print("ok")
@@ -0,0 +1,57 @@
+import time
+from pythreader import TaskQueue, TaskGraph, DependencyFailed
+
+log = []
+
+def step(name, dt=0.05):
+    log.append(("start", name))
+    time.sleep(dt)
+    log.append(("end", name))
+    return name
+
+def fail():
+    raise ValueError("failed")
+
+def position(event, name):
+    return log.index((event, name))
+
+q = TaskQueue(4)
+
+#       a
+#      / \
+#     b   c
+#      \ /
+#       d
+graph = TaskGraph()
+graph.add("d", step, "d", depends_on=["b", "c"])
+graph.add("b", step, "b", depends_on=["a"])
+graph.add("c", step, "c", depends_on=["a"])
+graph.add("a", step, "a")
+graph.submit(q)
+assert graph.wait() == {"a": "a", "b": "b", "c": "c", "d": "d"}
+assert position("end", "a") < position("start", "b") and position("end", "a") < position("start", "c")
+assert position("end", "b") < position("start", "d") and position("end", "c") < position("start", "d")
+print("graph: tasks ran in dependency order:", [name for event, name in log if event == "start"])
+
+# failure and cancellation propagate to the dependents
+log[:] = []
+t1 = q.append(fail)
+t2 = q.append(step, "t2", depends_on=[t1])
+t3 = q.append(step, "t3", depends_on=[t2])
+for t in (t2, t3):
+    try:
+        t.promise.wait()
+    except DependencyFailed:
+        pass
+    else:
+        assert False, "expected DependencyFailed"
+assert not log
+print("graph: failure propagated to the dependents")
+
+t4 = q.append(step, "t4", 1.0, after=0.5)
+t5 = q.append(step, "t5", depends_on=[t4])
+t4.cancel()
+assert t5.is_cancelled
+q.join()
+assert not log
+print("graph: cancellation propagated to the dependents")
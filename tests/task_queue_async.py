@@ -0,0 +1,58 @@
+import asyncio, time
+from pythreader import TaskQueue
+
+q = TaskQueue(5)
+
+async def fetch(i):
+    await asyncio.sleep(0.1)
+    return i
+
+def compute(i):
+    time.sleep(0.01)
+    return -i
+
+async def main():
+    # coroutine tasks and blocking tasks share the same concurrency limit
+    futures = [q.submit_async(fetch, i) for i in range(20)] + [q.submit_async(compute, i) for i in range(5)]
+    results = await asyncio.gather(*futures)
+    print("results:", results)
+    # any Promise can be awaited
+    result = await q.append(compute, 42).promise
+    print("awaited promise result:", result)
+
+t0 = time.time()
+asyncio.run(main())
+print("done in %.3f seconds" % (time.time() - t0,))
+
+# submitting coroutine tasks from a coroutine running on the shared event loop thread does not block the loop,
+# when the queue is at its capacity
+from pythreader.aio import default_event_loop
+
+bounded = TaskQueue(2, capacity=3)
+
+async def submit_many():
+    futures = [bounded.submit_async(fetch, i) for i in range(20)]
+    return await asyncio.gather(*futures)
+
+t0 = time.time()
+results = asyncio.run_coroutine_threadsafe(submit_many(), default_event_loop()).result(10)
+assert results == list(range(20))
+print("bounded queue: 20 coroutine tasks submitted from the queue's event loop in %.3f seconds" % (time.time() - t0,))
+
+async def submit_timeout():
+    blockers = [bounded.submit_async(fetch, i) for i in range(3)]      # fill the queue
+    late = bounded.submit_async(fetch, 99, timeout=0.05)
+    try:
+        await late
+    except RuntimeError as e:
+        print("bounded queue: submit timed out:", e)
+    else:
+        assert False, "expected time-out"
+    cancelled = bounded.submit_async(fetch, 100)
+    cancelled.cancel()
+    await asyncio.gather(*blockers)
+    await asyncio.sleep(0.1)
+    return bounded.is_empty()
+
+assert asyncio.run(submit_timeout())
+print("bounded queue: cancelled submission was not added")
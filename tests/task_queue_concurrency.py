@@ -0,0 +1,102 @@
+import time, threading
+from pythreader import TaskQueue, AIMDLimit, GradientLimit
+
+class Downstream(object):
+
+    # a service which handles up to "capacity" requests at once in "latency" seconds, and gets slower when overloaded
+
+    def __init__(self, capacity=8, latency=0.01):
+        self.Capacity = capacity
+        self.Latency = latency
+        self.Lock = threading.Lock()
+        self.Running = self.MaxRunning = 0
+        self.Fail = False
+
+    def call(self):
+        with self.Lock:
+            self.Running += 1
+            self.MaxRunning = max(self.MaxRunning, self.Running)
+            running = self.Running
+        try:
+            time.sleep(self.Latency * max(1.0, running / self.Capacity))
+            if self.Fail:
+                raise RuntimeError("overloaded")
+        finally:
+            with self.Lock:
+                self.Running -= 1
+
+def run(q, downstream, n):
+    tasks = [q.append(downstream.call) for _ in range(n)]
+    q.join()
+    return tasks
+
+def feed(q, downstream, n, backlog=20):
+    # steady load: keep up to "backlog" tasks waiting, measure the concurrency over the second half of the run
+    for i in range(n):
+        if i == n // 2:
+            downstream.MaxRunning = downstream.Running
+        while q.nwaiting() >= backlog:
+            time.sleep(0.001)
+        q.append(downstream.call)
+    q.join()
+
+# AIMD grows the limit from min_limit while the tasks succeed, up to max_limit
+limit = AIMDLimit(min_limit=1, max_limit=16, increase=2)
+q = TaskQueue(None, concurrency=limit)
+assert q.limit == 1
+downstream = Downstream(capacity=100)
+run(q, downstream, 300)
+print("aimd, no overload: limit %d, max running %d" % (q.limit, downstream.MaxRunning))
+assert q.limit == 16 and 8 < downstream.MaxRunning <= 17
+
+# AIMD backs off when the run time exceeds latency_threshold and settles around the downstream capacity
+limit = AIMDLimit(min_limit=1, max_limit=64, increase=2, latency_threshold=0.015)
+q = TaskQueue(None, concurrency=limit)
+downstream = Downstream(capacity=8)
+run(q, downstream, 600)
+print("aimd, latency threshold: limit %d, max running %d" % (q.limit, downstream.MaxRunning))
+assert 4 <= q.limit <= 16 and downstream.MaxRunning < 32
+
+# nworkers caps the adaptive limit
+q = TaskQueue(3, concurrency=AIMDLimit(min_limit=1, max_limit=64, increase=4))
+downstream = Downstream(capacity=100)
+run(q, downstream, 200)
+print("aimd with nworkers=3: limit %d, max running %d" % (q.limit, downstream.MaxRunning))
+assert q.limit == 3 and downstream.MaxRunning <= 3
+
+# failures reduce the limit
+limit = AIMDLimit(min_limit=2, max_limit=32, initial=32, backoff=0.5)
+q = TaskQueue(None, concurrency=limit)
+downstream = Downstream(capacity=100)
+downstream.Fail = True
+tasks = run(q, downstream, 20)
+print("aimd, failing tasks: limit %d" % (q.limit,))
+assert q.limit == 2
+try:
+    tasks[0].promise.wait()
+except RuntimeError:
+    pass
+else:
+    assert False, "expected RuntimeError"
+
+# gradient limit grows while the run time stays near the minimum and shrinks when the downstream queues up.
+# It overshoots until the smoothed run time catches up, so check the concurrency once it settles
+limit = GradientLimit(min_limit=1, max_limit=64)
+q = TaskQueue(None, concurrency=limit)
+downstream = Downstream(capacity=8, latency=0.02)
+feed(q, downstream, 1000)
+print("gradient: limit %d, max running %d, min latency %.3f, latency %.3f" % (q.limit, downstream.MaxRunning,
+            limit.MinLatency, limit.Latency))
+assert 4 <= q.limit <= 32 and downstream.MaxRunning < 48
+
+# tasks held back by the limit can be cancelled
+q = TaskQueue(None, concurrency=AIMDLimit(min_limit=1, max_limit=1))
+downstream = Downstream()
+downstream.Latency = 0.1
+tasks = [q.append(downstream.call) for _ in range(5)]
+for t in tasks[1:]:
+    q.cancel(t)
+q.join()
+assert tasks[0].has_started and not any(t.has_started for t in tasks[1:])
+assert all(t.promise.Cancelled for t in tasks[1:])
+print("cancel: 4 waiting tasks cancelled, max running %d" % (downstream.MaxRunning,))
@@ -0,0 +1,87 @@
+import time, threading
+from pythreader import TaskQueue, AIMDLimit
+
+class Tracker(object):
+
+    def __init__(self):
+        self.Lock = threading.Lock()
+        self.Running = self.MaxRunning = 0
+        self.Pulled = 0
+
+    def items(self, n):
+        for i in range(n):
+            self.Pulled += 1
+            yield i
+
+    def work(self, i):
+        with self.Lock:
+            self.Running += 1
+            self.MaxRunning = max(self.MaxRunning, self.Running)
+        time.sleep(0.02)
+        with self.Lock:
+            self.Running -= 1
+        return i
+
+def run(queue, n=40, **args):
+    tracker = Tracker()
+    held = 0
+    returned = 0
+    results = []
+    for result in queue.consume(tracker.items(n), tracker.work, **args):
+        returned += 1
+        held = max(held, tracker.Pulled - returned)
+        results.append(result)
+    return tracker, held, results
+
+# bounded queue: up to nworkers run at once, at most nworkers + prefetch items held
+tracker, held, results = run(TaskQueue(4), prefetch=2)
+print("nworkers=4: max running %d, max items held %d" % (tracker.MaxRunning, held))
+assert sorted(results) == list(range(40))
+assert tracker.MaxRunning == 4 and held <= 6
+
+# unlimited queue: the items still run concurrently
+tracker, held, results = run(TaskQueue(None), n=200)
+print("nworkers=None: max running %d, max items held %d" % (tracker.MaxRunning, held))
+assert tracker.MaxRunning > 10 and held <= TaskQueue.UnlimitedConsumeWindow + 1
+
+# explicit window
+tracker, held, results = run(TaskQueue(None), window=5)
+print("window=5: max running %d, max items held %d" % (tracker.MaxRunning, held))
+assert tracker.MaxRunning == 5 and held <= 5
+
+# adaptive concurrency: the window follows the limit as it grows
+tracker, held, results = run(TaskQueue(None, concurrency=AIMDLimit(min_limit=1, max_limit=8, increase=4)), n=100)
+print("adaptive: max running %d" % (tracker.MaxRunning,))
+assert 1 < tracker.MaxRunning <= 9
+
+# ordered results
+tracker, held, results = run(TaskQueue(3), ordered=True)
+assert results == list(range(40))
+print("ordered: results in the order of the items")
+
+# a failed item raises the exception when the iterator reaches it, the other results are still returned
+def fail_on_5(i):
+    if i == 5:
+        raise ValueError("item 5")
+    return i
+
+results = []
+it = TaskQueue(2).consume(range(10), fail_on_5, ordered=True)
+try:
+    for r in it:
+        results.append(r)
+except ValueError as e:
+    print("exception:", e, "after results", results)
+else:
+    assert False, "expected ValueError"
+assert results == [0, 1, 2, 3, 4]
+assert list(it) == [6, 7, 8, 9]
+
+# stopping early does not pull the rest of the items
+tracker = Tracker()
+q = TaskQueue(2)
+for r in q.consume(tracker.items(1000), tracker.work):
+    break
+q.join()
+print("stopped early: %d of 1000 items pulled" % (tracker.Pulled,))
+assert tracker.Pulled <= 4          # window of 3 plus the item pulled when the first result was returned
@@ -0,0 +1,46 @@
+import time
+from pythreader import TaskQueue, Task, DeadlineExceeded
+
+def slow(dt):
+    time.sleep(dt)
+    return dt
+
+class Cooperative(Task):
+    def run(self):
+        # wait on the token instead of sleeping, so that the task stops when it expires
+        return "cancelled" if self.token.wait(5) else "done"
+
+q = TaskQueue(1)
+
+# a queued task expires without starting
+t1 = q.append(slow, 0.5)
+t2 = q.append(slow, 0.1, deadline=0.2)
+t0 = time.time()
+try:
+    t2.promise.wait()
+except DeadlineExceeded:
+    pass
+else:
+    assert False, "expected DeadlineExceeded"
+assert not t2.has_started and t2.is_expired
+print("deadline: queued task expired after %.3f seconds without starting" % (time.time() - t0,))
+assert t1.promise.wait() == 0.5
+
+# a running task gets its token cancelled and its promise failed
+t3 = q.append(Cooperative(), run_timeout=0.2)
+t0 = time.time()
+try:
+    t3.promise.wait()
+except DeadlineExceeded:
+    pass
+else:
+    assert False, "expected DeadlineExceeded"
+assert t3.token.is_cancelled
+print("deadline: running task expired after %.3f seconds" % (time.time() - t0,))
+
+# a straggler does not hold the queue slot after it expires
+t4 = q.append(slow, 1.0, run_timeout=0.1)
+t5 = q.append(slow, 0.05)
+t0 = time.time()
+assert t5.promise.wait() == 0.05
+print("deadline: next task ended %.3f seconds after the straggler was added" % (time.time() - t0,))
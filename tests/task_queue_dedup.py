@@ -0,0 +1,93 @@
+import time, threading
+from pythreader import TaskQueue
+
+calls = []
+lock = threading.Lock()
+
+def fetch(url, dt=0.1, fail=False):
+    with lock:
+        calls.append(url)
+    time.sleep(dt)
+    if fail:
+        raise RuntimeError("%s failed" % (url,))
+    return "content of " + url
+
+# concurrent requests for the same key share one run, the task is returned to all of them
+q = TaskQueue(4)
+tasks = [q.append(fetch, "x", dedup_key="x") for _ in range(5)] + [q.append(fetch, "y", dedup_key="y")]
+assert all(t is tasks[0] for t in tasks[:5]) and tasks[5] is not tasks[0]
+assert [t.promise.wait() for t in tasks] == ["content of x"] * 5 + ["content of y"]
+print("single flight: 6 requests, %d calls" % (len(calls),))
+assert sorted(calls) == ["x", "y"]
+
+# without a cache, a request after the task ends runs again
+calls[:] = []
+assert q.append(fetch, "x", dedup_key="x").promise.wait() == "content of x"
+assert calls == ["x"]
+
+# with a cache, recent results are returned as completed tasks without running
+calls[:] = []
+q = TaskQueue(4, dedup_cache_size=2, dedup_cache_ttl=0.3)
+for url in ("a", "b"):
+    q.append(fetch, url, 0.01, dedup_key=url).promise.wait()
+cached = q.append(fetch, "a", dedup_key="a")
+assert cached.promise.wait() == "content of a" and calls == ["a", "b"]
+print("cache: cached result returned without a run")
+
+# LRU eviction: "a" was used last, so "b" is evicted by "c"
+q.append(fetch, "c", 0.01, dedup_key="c").promise.wait()
+calls[:] = []
+q.append(fetch, "a", dedup_key="a").promise.wait()
+q.append(fetch, "b", 0.01, dedup_key="b").promise.wait()
+print("cache: after eviction, calls", calls)
+assert calls == ["b"]
+
+# cached results expire after dedup_cache_ttl
+time.sleep(0.35)
+calls[:] = []
+q.append(fetch, "b", 0.01, dedup_key="b").promise.wait()
+assert calls == ["b"]
+print("cache: expired result fetched again")
+
+# clear_dedup_cache discards the cached results
+q.clear_dedup_cache()
+calls[:] = []
+q.append(fetch, "b", 0.01, dedup_key="b").promise.wait()
+assert calls == ["b"]
+
+# failed tasks are not cached, all the callers see the exception and the next request runs again
+calls[:] = []
+tasks = [q.append(fetch, "bad", 0.05, True, dedup_key="bad") for _ in range(3)]
+for t in tasks:
+    try:
+        t.promise.wait()
+    except RuntimeError:
+        pass
+    else:
+        assert False, "expected RuntimeError"
+assert q.append(fetch, "bad", 0.01, dedup_key="bad").promise.wait() == "content of bad"
+print("failure: %d calls for 4 requests, the failure was not cached" % (len(calls),))
+assert calls == ["bad", "bad"]
+
+# a cancelled waiting task is removed from the in-flight table, the next request adds a new task
+calls[:] = []
+q.hold()
+first = q.append(fetch, "z", 0.01, dedup_key="z")
+assert q.append(fetch, "z", dedup_key="z") is first
+q.cancel(first)
+second = q.append(fetch, "z", 0.01, dedup_key="z")
+assert second is not first
+q.release()
+assert first.promise.wait(1) is None and second.promise.wait(1) == "content of z"
+print("cancel: cancelled task replaced, calls", calls)
+assert calls == ["z"]
+
+# flush forgets the waiting tasks too
+q.hold()
+first = q.append(fetch, "w", 0.01, dedup_key="w")
+q.flush()
+q.release()
+assert q.append(fetch, "w", 0.01, dedup_key="w") is not first
+q.join()
+assert not q.InFlight
+print("flush: in-flight table emptied")
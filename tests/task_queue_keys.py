@@ -0,0 +1,93 @@
+import time, threading
+from pythreader import TaskQueue, DeadlineExceeded
+
+class Hosts(object):
+
+    def __init__(self):
+        self.Lock = threading.Lock()
+        self.Running = {}
+        self.MaxRunning = {}
+
+    def call(self, host, dt=0.05, fail=False):
+        with self.Lock:
+            n = self.Running[host] = self.Running.get(host, 0) + 1
+            self.MaxRunning[host] = max(self.MaxRunning.get(host, 0), n)
+        try:
+            time.sleep(dt)
+            if fail:
+                raise RuntimeError("%s failed" % (host,))
+            return host
+        finally:
+            with self.Lock:
+                self.Running[host] -= 1
+
+# key_limit applies to every key, key_limits overrides it for some keys, tasks without a key are not limited
+hosts = Hosts()
+q = TaskQueue(10, key_limit=2, key_limits={"slow": 1})
+for _ in range(6):
+    for host in ("a", "b", "slow", None):
+        q.append(hosts.call, host, key=host)
+q.join()
+print("key limits: max running per key", hosts.MaxRunning)
+assert hosts.MaxRunning["a"] == 2 and hosts.MaxRunning["b"] == 2 and hosts.MaxRunning["slow"] == 1
+assert hosts.MaxRunning[None] > 2
+assert q.key_counts("a") == (0, 0, 0) and not q.Keys
+
+# a backlog for one key does not hold up the tasks of the other keys
+hosts = Hosts()
+q = TaskQueue(4, key_limit=1)
+slow = [q.append(hosts.call, "slow", 0.2, key="slow") for _ in range(5)]
+t0 = time.time()
+fast = q.append(hosts.call, "fast", 0.01, key="fast")
+fast.promise.wait()
+print("head of line: fast key task done in %.3f seconds behind 5 tasks of a slow key" % (time.time() - t0,))
+assert time.time() - t0 < 0.15
+print("key_counts('slow'):", q.key_counts("slow"))
+assert q.key_counts("slow") == (0, 4, 1)
+
+# raising the limit admits the backlog
+q.set_key_limit("slow", 3)
+time.sleep(0.05)
+print("after set_key_limit('slow', 3):", q.key_counts("slow"))
+assert q.key_counts("slow")[2] == 3
+
+# cancelled backlog tasks give up their place, the failed and timed out tasks free their slots
+q.join()
+q.set_key_limit("h", 1)
+hosts = Hosts()
+tasks = [q.append(hosts.call, "h", 0.05, key="h") for _ in range(4)]
+q.cancel(tasks[1])
+tasks[2].cancel()
+assert q.key_counts("h")[1] == 1
+failed = q.append(hosts.call, "h", 0.01, True, key="h")
+timed_out = q.append(hosts.call, "h", 1.0, key="h", run_timeout=0.1)
+last = q.append(hosts.call, "h", 0.01, key="h")
+t0 = time.time()
+assert last.promise.wait(2) == "h"
+print("cancel/fail/timeout: last task done after %.3f seconds" % (time.time() - t0,))
+assert time.time() - t0 < 0.6
+assert tasks[1].promise.Cancelled and tasks[2].promise.Cancelled
+assert not tasks[1].has_started and not tasks[2].has_started
+try:
+    failed.promise.wait()
+except RuntimeError:
+    pass
+else:
+    assert False, "expected RuntimeError"
+try:
+    timed_out.promise.wait()
+except DeadlineExceeded:
+    pass
+else:
+    assert False, "expected DeadlineExceeded"
+q.join()
+
+# flush discards the key backlogs
+q.hold()
+for _ in range(5):
+    q.append(hosts.call, "h", key="h")
+assert q.key_counts("h") == (1, 4, 0)
+q.flush()
+q.release()
+assert q.key_counts("h") == (0, 0, 0) and len(q) == 0
+print("flush: key backlog discarded")
@@ -0,0 +1,18 @@
+import time
+from pythreader import TaskQueue
+
+def square(x):
+    return x*x
+
+q = TaskQueue(8, pool=True)
+
+t0 = time.time()
+results = list(q.map(square, range(1000000), chunksize=10000))
+assert results == [x*x for x in range(1000000)]
+print("map: 1M items processed in %.3f seconds" % (time.time() - t0,))
+
+t0 = time.time()
+group = q.extend(lambda i=i: square(i) for i in range(10000))
+print("extend: 10k tasks added in %.3f seconds" % (time.time() - t0,))
+assert group.wait() == [x*x for x in range(10000)]
+print("extend: all results received in %.3f seconds" % (time.time() - t0,))
@@ -0,0 +1,78 @@
+import time, random
+from pythreader import TaskQueue
+
+def job(dt):
+    time.sleep(dt)
+    return time.time()
+
+# EDF: tasks start in the order of their deadlines
+order = []
+q = TaskQueue(1, policy="edf")
+q.hold()
+now = time.time()
+for i, d in enumerate([5, 3, 4, 1, 2]):
+    q.append(order.append, i, deadline=now + d)
+q.release()
+q.join()
+print("edf: start order by deadline:", order)
+assert order == [3, 4, 1, 2, 0]
+
+# SJF vs FIFO: mean response time for a mix of short and long jobs
+def mean_response(policy, costs, use_cost):
+    q = TaskQueue(1, policy=policy)
+    q.hold()
+    t0 = time.time()
+    tasks = [q.append(job, c, cost=c if use_cost else None) for c in costs]
+    q.release()
+    return sum(t.promise.wait() - t0 for t in tasks) / len(tasks)
+
+random.seed(1)
+costs = [random.choice([0.001, 0.001, 0.001, 0.05]) for _ in range(40)]
+fifo = mean_response("fifo", costs, True)
+sjf = mean_response("sjf", costs, True)
+print("sjf: mean response time %.3f, fifo: %.3f" % (sjf, fifo))
+assert sjf < fifo
+
+# SJF learns the mean run time of each function
+def short():
+    time.sleep(0.001)
+    return time.time()
+
+def long():
+    time.sleep(0.05)
+    return time.time()
+
+q = TaskQueue(1, policy="sjf")
+q.append(long).promise.wait()
+q.append(short).promise.wait()
+q.hold()
+t_long = q.append(long)
+t_short = q.append(short)
+q.release()
+assert t_short.promise.wait() < t_long.promise.wait()
+print("sjf: learned run times:", {f.co_name: "%.3f" % (t,) for f, t in q.Policy.MeanRunTimes.items()})
+
+# SJF does not keep an estimate per closure, and does not keep the closures alive
+import gc, weakref
+
+class Payload(object):
+    pass
+
+def make_job(payload):
+    def run():
+        return payload
+    return run
+
+refs = []
+q = TaskQueue(4, policy="sjf")
+for _ in range(1000):
+    payload = Payload()
+    refs.append(weakref.ref(payload))
+    q.append(make_job(payload))
+    q.append(lambda p=payload: p)
+q.join()
+del payload
+gc.collect()
+print("sjf: %d estimates for 2000 closures and lambdas, %d payloads alive" % (len(q.Policy.MeanRunTimes), sum(r() is not None for r in refs)))
+assert len(q.Policy.MeanRunTimes) == 2
+assert all(r() is None for r in refs)
@@ -0,0 +1,28 @@
+import time, random
+from pythreader import TaskQueue, Task
+
+class MyTask(Task):
+
+    def __init__(self, i):
+        Task.__init__(self)
+        self.I = i
+
+    def run(self):
+        time.sleep(random.random()*0.01)
+        return self.I
+
+q = TaskQueue(5, pool=True, idle_timeout=1.0)
+
+t0 = time.time()
+tasks = [q.append(MyTask(i)) for i in range(1000)]
+results = [t.promise.wait() for t in tasks]
+assert results == list(range(1000))
+print("1000 tasks done in %.3f seconds using %d worker threads" % (time.time() - t0, q.nworker_threads()))
+assert q.nworker_threads() <= 5
+
+q.join()
+time.sleep(1.5)
+print("worker threads after idle timeout:", q.nworker_threads())
+assert q.nworker_threads() == 0
+
+q.stop()
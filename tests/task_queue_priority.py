@@ -0,0 +1,72 @@
+import time
+from pythreader import TaskQueue
+
+order = []
+
+def work(name):
+    order.append(name)
+    time.sleep(0.01)
+    return name
+
+# waiting tasks with higher priority start first, tasks with equal priority in the order they were added
+q = TaskQueue(1)
+q.hold()
+for name, priority in [("low1", 0), ("high1", 10), ("mid", 5), ("low2", 0), ("high2", 10)]:
+    q.append(work, name, priority=priority)
+q.release()
+q.join()
+print("priorities:", order)
+assert order == ["high1", "high2", "mid", "low1", "low2"]
+
+# insert() puts the task ahead of the waiting tasks with the same priority
+order[:] = []
+q.hold()
+q.append(work, "a")
+q.append(work, "b")
+q.insert(work, "first")
+q.release()
+q.join()
+print("insert:", order)
+assert order == ["first", "a", "b"]
+
+# cancelled waiting tasks are skipped, their promises are cancelled
+order[:] = []
+q.hold()
+tasks = [q.append(work, "p%d" % (i,), priority=i) for i in range(5)]
+q.cancel(tasks[4])
+tasks[1].cancel()
+assert len(q) == 3
+q.release()
+q.join()
+print("cancel:", order)
+assert order == ["p3", "p2", "p0"]
+assert tasks[4].promise.wait(1) is None and tasks[4].is_cancelled and not tasks[4].has_started
+assert tasks[1].promise.Cancelled
+
+# without aging, a steady stream of higher priority tasks starves a low priority one,
+# with aging, the low priority task starts after waiting about (10 - 0) / aging seconds
+def stream(aging):
+    q = TaskQueue(1, aging=aging)
+    q.hold()
+    low = q.append(time.time, priority=0)
+    q.append(time.sleep, 0.01, priority=10)
+    t0 = time.time()
+    q.release()
+    while time.time() < t0 + 1.0 and not low.has_started:
+        q.append(time.sleep, 0.01, priority=10)
+        while q.nwaiting() > 2:
+            time.sleep(0.005)
+    q.flush()
+    started = low.has_started
+    if not started:
+        low.cancel()
+    q.join()
+    return started, (low.promise.wait(1) - t0) if started else None
+
+started, waited = stream(0)
+print("no aging: low priority task started:", started)
+assert not started
+
+started, waited = stream(20.0)
+print("aging=20: low priority task started after %.3f seconds" % (waited,))
+assert started and waited < 0.9
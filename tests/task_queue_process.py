@@ -0,0 +1,93 @@
+import os, time
+from pythreader import TaskQueue, ProcessTaskQueue, ProcessExecutor, Task, DeadlineExceeded
+
+def pid(dt=0):
+    time.sleep(dt)
+    return os.getpid()
+
+def square(x):
+    return x * x
+
+def fail(x):
+    raise ValueError("failed on %s" % (x,))
+
+class CountTask(Task):
+
+    def __init__(self, n):
+        Task.__init__(self)
+        self.N = n
+        self.Done = False
+
+    def run(self):
+        self.Done = True                # set in the worker process copy of the task only
+        return sum(range(self.N))
+
+if __name__ == "__main__":
+
+    # the tasks run in the worker processes
+    q = ProcessTaskQueue(2)
+    pids = set(t.promise.wait() for t in [q.append(pid, 0.1) for _ in range(6)])
+    print("process: tasks ran in worker processes", sorted(pids))
+    assert os.getpid() not in pids and len(pids) <= 2
+
+    results = [t.promise.wait() for t in [q.append(square, i) for i in range(20)]]
+    assert results == [i * i for i in range(20)]
+
+    # Task subclass instances are pickled, the result comes back, the changes to the task do not
+    task = CountTask(1000)
+    assert q.append(task).promise.wait() == sum(range(1000))
+    assert not task.Done
+    print("process: Task subclass result", task.promise.wait())
+
+    # an exception raised in the worker process fails the task promise
+    try:
+        q.append(fail, 7).promise.wait()
+    except ValueError as e:
+        print("process: exception from the worker:", e)
+    else:
+        assert False, "expected ValueError"
+
+    # unpicklable tasks fail instead of hanging the queue
+    try:
+        q.append(lambda: 1).promise.wait(10)
+    except Exception as e:
+        print("process: unpicklable task failed with", type(e).__name__)
+    else:
+        assert False, "expected pickling error"
+
+    # waiting tasks can be cancelled
+    q.hold()
+    tasks = [q.append(square, i) for i in range(4)]
+    q.cancel(tasks[1])
+    q.release()
+    assert [t.promise.wait(10) for t in tasks] == [0, None, 4, 9]
+    assert tasks[1].is_cancelled and not tasks[1].has_started
+    print("process: cancelled waiting task did not run")
+
+    # run_timeout fails the promise of a task which runs too long and frees its slot
+    t0 = time.time()
+    slow = q.append(pid, 1.0, run_timeout=0.2)
+    try:
+        slow.promise.wait(5)
+    except DeadlineExceeded:
+        print("process: run_timeout expired after %.3f seconds" % (time.time() - t0,))
+    else:
+        assert False, "expected DeadlineExceeded"
+    assert time.time() - t0 < 0.9
+
+    q.join()
+    q.stop()
+
+    # executor="process" and an explicit executor object behave the same way
+    for executor in ("process", ProcessExecutor(2)):
+        q = TaskQueue(2, executor=executor)
+        assert q.append(square, 12).promise.wait() == 144
+        q.stop()
+    print("process: executor='process' and ProcessExecutor(2) work")
+
+    try:
+        TaskQueue(2, executor="gpu")
+    except ValueError as e:
+        print("process: unknown executor:", e)
+    else:
+        assert False, "expected ValueError"
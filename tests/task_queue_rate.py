@@ -0,0 +1,54 @@
+import time
+from pythreader import TaskQueue, TokenBucket, SlidingWindow
+
+def run(q, n):
+    t0 = time.time()
+    starts = [t.promise.wait() - t0 for t in [q.append(time.time) for _ in range(n)]]
+    return starts
+
+# token bucket: a burst of starts, then the sustained rate
+q = TaskQueue(None, rate=20, burst=5)
+starts = run(q, 25)
+print("rate=20, burst=5: first 5 within %.3f, all 25 within %.3f seconds" % (starts[4], starts[-1]))
+assert starts[4] < 0.05
+assert 0.9 < starts[-1] < 1.3
+
+# after a pause, the bucket refills up to burst, not more
+time.sleep(1.0)
+starts = run(q, 10)
+print("after a pause: 5 starts within %.3f, 10 within %.3f seconds" % (starts[4], starts[-1]))
+assert starts[4] < 0.05 and 0.2 < starts[-1] < 0.4
+
+# sliding window: at most 4 starts within any 0.5 second window
+q = TaskQueue(None, window=(4, 0.5))
+starts = run(q, 12)
+print("window=(4, 0.5): starts at", ["%.2f" % (t,) for t in starts])
+for i in range(len(starts) - 4):
+    assert starts[i + 4] - starts[i] >= 0.5 - 0.01
+assert starts[-1] < 1.3
+
+# both limits together, the stricter one wins
+q = TaskQueue(None, rate=100, burst=10, window=(3, 0.3))
+starts = run(q, 9)
+print("rate=100 and window=(3, 0.3): 9 starts within %.3f seconds" % (starts[-1],))
+assert starts[-1] >= 0.6 - 0.01
+
+# rate limited tasks waiting for their turn can be cancelled, the rest keep the rate
+q = TaskQueue(None, rate=10)
+t0 = time.time()
+tasks = [q.append(time.time) for _ in range(6)]
+for t in tasks[1:4]:
+    q.cancel(t)
+results = [t.promise.wait(2) for t in tasks]
+assert results[1:4] == [None] * 3
+print("cancel: 3 of 6 cancelled, the rest started after", ["%.2f" % (r - t0,) for r in results if r is not None])
+assert results[-1] - t0 < 0.35
+
+# the limiters reject invalid parameters
+for cls, args in [(TokenBucket, (0,)), (TokenBucket, (10, 0)), (SlidingWindow, (0, 1.0))]:
+    try:
+        cls(*args)
+    except ValueError as e:
+        print("%s%s: %s" % (cls.__name__, args, e))
+    else:
+        assert False, "expected ValueError"
@@ -0,0 +1,36 @@
+import time
+from pythreader import TaskQueue, RetryPolicy
+
+attempts = []
+
+def flaky(n):
+    attempts.append(time.time())
+    if len(attempts) < n:
+        raise ValueError("attempt %d failed" % (len(attempts),))
+    return "done"
+
+q = TaskQueue(2, pool=True)
+
+t0 = time.time()
+task = q.append(flaky, 3, retry=RetryPolicy(5, backoff=0.2))
+assert task.promise.wait() == "done"
+assert task.attempts == 3
+print("retry: 3 attempts in %.3f seconds, gaps: %s" % (time.time() - t0, 
+        ["%.3f" % (t1 - t0) for t0, t1 in zip(attempts[:-1], attempts[1:])]))
+
+# waiting retries do not hold workers
+attempts[:] = []
+tasks = [q.append(flaky, 1000, retry=RetryPolicy(3, backoff=0.5)) for _ in range(2)]
+time.sleep(0.2)
+t0 = time.time()
+assert q.append(lambda: "free").promise.wait() == "free"
+print("retry: other task ran while retries were waiting, after %.3f seconds" % (time.time() - t0,))
+for task in tasks:
+    try:
+        task.promise.wait()
+    except ValueError:
+        pass
+    else:
+        assert False, "expected ValueError"
+    assert task.attempts == 3
+print("retry: tasks failed after 3 attempts")
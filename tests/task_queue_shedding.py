@@ -0,0 +1,34 @@
+import time
+from pythreader import TaskQueue, TaskRejected, CoDel
+
+def work(dt):
+    time.sleep(dt)
+    return dt
+
+def outcome(task):
+    try:
+        task.promise.wait()
+        return "done"
+    except TaskRejected:
+        return "rejected"
+
+# tasks which waited longer than max_queue_wait are dropped
+q = TaskQueue(2, max_queue_wait=0.25)
+tasks = [q.append(work, 0.1) for _ in range(20)]
+outcomes = [outcome(t) for t in tasks]
+print("max_queue_wait: %d done, %d rejected" % (outcomes.count("done"), outcomes.count("rejected")))
+assert outcomes[:4] == ["done"]*4 and outcomes[-1] == "rejected"
+
+# try_append rejects immediately when the queue is full or dropping
+q = TaskQueue(1, capacity=3)
+added = [q.try_append(work, 0.1) for _ in range(5)]
+assert added[3] is None and added[4] is None
+print("try_append: %d of 5 tasks accepted" % (len([t for t in added if t is not None]),))
+q.join()
+
+# CoDel absorbs short bursts, but sheds load when the queue wait time stays above the target
+q = TaskQueue(2, codel=CoDel(target=0.02, interval=0.1))
+tasks = [q.append(work, 0.01) for _ in range(400)]
+outcomes = [outcome(t) for t in tasks]
+print("codel: %d done, %d rejected" % (outcomes.count("done"), outcomes.count("rejected")))
+assert outcomes.count("rejected") > 0 and outcomes[:20] == ["done"]*20
@@ -0,0 +1,45 @@
+import time, io, random
+from pythreader import TaskQueue, Histogram
+
+h = Histogram()
+values = [random.random() for _ in range(100000)]
+for v in values:
+    h.record(v)
+values.sort()
+for p in (50, 90, 99):
+    exact = values[int(len(values) * p / 100) - 1]
+    assert abs(h.percentile(p) - exact) / exact < 0.05, (p, h.percentile(p), exact)
+print("histogram: %d values in %d buckets, p50=%.4f p99=%.4f" % (h.Count, len(h.Counts), h.percentile(50), h.percentile(99)))
+
+class Delegate(object):
+    def taskEnded(self, queue, task, result):
+        pass
+
+def work(dt):
+    time.sleep(dt)
+
+def fail():
+    raise ValueError("test")
+
+q = TaskQueue(2, delegate=Delegate(), name="test")
+for _ in range(20):
+    q.append(work, 0.01)
+q.append(fail)
+cancelled = q.append(work, 0.01, after=10)
+cancelled.cancel()
+q.join()
+
+stats = q.stats()
+print("stats:", {k: v for k, v in stats.items() if not isinstance(v, dict)})
+print("run time:", stats["run_time"])
+assert stats["started"] == 21 and stats["completed"] == 20 and stats["failed"] == 1 and stats["cancelled"] == 1
+assert stats["waiting"] == stats["running"] == 0
+assert stats["run_time"]["count"] == 21 and 0.009 < stats["run_time"]["p50"] < 0.02
+assert stats["delegate_time"]["count"] == 20
+
+out = io.StringIO()
+q.export_stats(out)
+text = out.getvalue()
+assert 'pythreader_task_queue_tasks_completed_total{queue="test"} 20' in text
+assert 'pythreader_task_queue_run_time_seconds_count{queue="test"} 21' in text
+print(text)
@@ -0,0 +1,35 @@
+import time
+from pythreader import TaskQueue
+
+starts = []
+
+def work(tenant):
+    starts.append(tenant)
+    time.sleep(0.001)
+
+q = TaskQueue(2, tenant_weights={"heavy": 3})
+q.hold()
+for _ in range(500):
+    q.append(work, "noisy", tenant="noisy")
+for _ in range(200):
+    q.append(work, "heavy", tenant="heavy")
+for _ in range(10):
+    q.append(work, "quiet", tenant="quiet")
+q.release()
+q.join()
+
+first = starts[:50]
+print("first 50 starts:", {t: first.count(t) for t in ("noisy", "heavy", "quiet")})
+assert starts.index("quiet") < 10
+assert first.count("heavy") > 2 * first.count("noisy")
+stats = q.tenant_stats()
+print("tenant stats:", stats)
+assert stats["noisy"]["ended"] == 500 and stats["quiet"]["started"] == 10 and stats["heavy"]["running"] == 0
+
+for weights in ({"bad": 0}, {"bad": -1}):
+    try:
+        TaskQueue(2, tenant_weights=weights)
+    except ValueError as e:
+        print("tenant weights %s rejected: %s" % (weights, e))
+    else:
+        assert False, "expected ValueError"
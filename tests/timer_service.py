@@ -0,0 +1,55 @@
+import time, threading
+from pythreader import TimerService, TaskQueue, Timer
+
+service = TimerService(name="test")
+
+# move the wheel past tick 0, then schedule calls beyond the wheel span (~795 days)
+done = threading.Event()
+service.schedule(0.01, done.set)
+assert done.wait(1)
+far = service.schedule(86400 * 800, print, "never")
+farther = service.schedule(86400 * 5000, print, "never")
+assert service.pending() == 2
+service.cancel(far)
+service.cancel(farther)
+assert service.pending() == 0
+print("far future: scheduled and cancelled calls 800 and 5000 days ahead")
+
+# the wheel at the last tick of its span keeps far calls aside and places them on the next tick
+with service:
+    saved = service.Tick
+    service.Tick = (1 << (service.Bits * service.Levels)) - 1
+    entry = service.schedule(86400 * 800, print, "never")
+    assert service.pending() == 1 and entry in service.Due
+    service.cancel(entry)
+    assert service.pending() == 0
+    service.Due = []
+    service.Tick = saved
+
+# a TaskQueue task with a far "after" and deadline
+q = TaskQueue(2)
+task = q.append(time.sleep, 0, after=86400 * 800, deadline=86400 * 900)
+assert not task.has_started
+task.cancel()
+print("far future: task with far start time and deadline cancelled")
+
+# blocking callbacks do not hold up the other calls, the dispatch pool grows
+release = threading.Event()
+for _ in range(8):
+    service.schedule(0, release.wait, 5)
+fired = threading.Event()
+t0 = time.time()
+service.schedule(0.1, fired.set)
+assert fired.wait(2), "the call was starved by blocking callbacks"
+print("dispatch: call made after %.3f seconds with 8 blocked callbacks" % (time.time() - t0,))
+
+# blocking user Timers on the process-wide service do not starve the TaskQueue timers
+timers = [Timer(release.wait, 5, t=0) for _ in range(4)]
+time.sleep(0.1)
+t0 = time.time()
+task = q.append(time.time, after=0.1)
+started = task.promise.wait(2)
+print("dispatch: task with after=0.1 started after %.3f seconds with 4 blocking Timers" % (started - t0,))
+release.set()
+
+print("ok")